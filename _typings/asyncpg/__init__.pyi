@@ -9,7 +9,7 @@ from .pool import PoolConnectionProxy
 from .connection import Connection
 from .protocol import Record
 
-__all__ = ["PoolConnectionProxy", "Connection", "Record", "PoolAcquireContext", "Pool", "create_pool"]
+__all__ = ["PoolConnectionProxy", "Connection", "Record", "PoolAcquireContext", "Pool", "connect", "create_pool"]
 
 class PoolAcquireContext:
     async def __aenter__(self) -> PoolConnectionProxy: ...
@@ -19,12 +19,19 @@ class PoolAcquireContext:
         exec: BaseException | None = ...,
         tb: t.Type[tp.TracebackType] | None = ...,
     ) -> None: ...
+    def __await__(self) -> t.Generator[t.Any, None, PoolConnectionProxy]: ...
 
 class Pool:
     """A Connection to a database."""
 
     def acquire(self, *, timeout: float | None = ...) -> PoolAcquireContext: ...
+    async def release(self, connection: PoolConnectionProxy, *, timeout: float | None = ...) -> None: ...
+    def get_size(self) -> int: ...
+    def get_idle_size(self) -> int: ...
+    def get_min_size(self) -> int: ...
+    def get_max_size(self) -> int: ...
     async def close(self) -> None: ...
+    async def expire_connections(self) -> None: ...
     async def execute(self, query: str, *args: t.Any, timeout: float | None = ...): ...
     async def executemany(self, command: str, args: t.Any, *, timeout: float | None = ...): ...
 
@@ -42,3 +49,15 @@ async def create_pool(
     record_class: t.Type[Record] = ...,
     **connect_kwargs: str | int,
 ) -> Pool: ...
+
+async def connect(
+    dsn: str | None = ...,
+    *,
+    host: str | None = ...,
+    port: int | None = ...,
+    user: str | None = ...,
+    password: str | None = ...,
+    database: str | None = ...,
+    timeout: float = ...,
+    **kwargs: t.Any,
+) -> Connection: ...
@@ -2,6 +2,7 @@ import typing as t
 
 from .prepared_stmt import PreparedStatement
 from .protocol import Record
+from .transaction import Transaction
 
 class Connection:
     """Base connection class."""
@@ -10,3 +11,10 @@ class Connection:
         self, query: str, *, timeout: float | None = ..., record_class: Record | None = ...
     ) -> PreparedStatement: ...
     async def execute(self, query: str, *args: t.Any, timeout: float | None = ...) -> str: ...
+    async def fetchval(self, query: str, *args: t.Any, column: int = ..., timeout: float | None = ...) -> t.Any: ...
+    def transaction(self, *, isolation: str | None = ..., readonly: bool = ..., deferrable: bool = ...) -> Transaction: ...
+    def is_in_transaction(self) -> bool: ...
+    async def add_listener(self, channel: str, callback: t.Callable[["Connection", int, str, str], t.Any]) -> None: ...
+    def add_termination_listener(self, callback: t.Callable[["Connection"], t.Any]) -> None: ...
+    def is_closed(self) -> bool: ...
+    async def close(self, *, timeout: float | None = ...) -> None: ...
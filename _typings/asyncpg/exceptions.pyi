@@ -0,0 +1,5 @@
+class PostgresError(Exception): ...
+class FeatureNotSupportedError(PostgresError): ...
+class InvalidCachedStatementError(FeatureNotSupportedError): ...
+class InterfaceError(Exception): ...
+class OutdatedSchemaCacheError(InterfaceError): ...
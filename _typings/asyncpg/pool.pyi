@@ -2,6 +2,7 @@ import typing as t
 
 from .prepared_stmt import PreparedStatement
 from .protocol import Record
+from .transaction import Transaction
 
 class PoolConnectionProxy:
     """Proxy class for a connection."""
@@ -10,3 +11,22 @@ class PoolConnectionProxy:
         self, query: str, *, timeout: float | None = ..., record_class: Record | None = ...
     ) -> PreparedStatement: ...
     async def execute(self, query: str, *args: t.Any, timeout: float | None = ...) -> str: ...
+    async def fetchval(self, query: str, *args: t.Any, column: int = ..., timeout: float | None = ...) -> t.Any: ...
+    async def fetchrow(
+        self, query: str, *args: t.Any, timeout: float | None = ..., record_class: t.Type[Record] | None = ...
+    ) -> Record | None: ...
+    async def fetch(
+        self, query: str, *args: t.Any, timeout: float | None = ..., record_class: t.Type[Record] | None = ...
+    ) -> list[Record]: ...
+    async def executemany(self, command: str, args: t.Iterable[t.Any], *, timeout: float | None = ...) -> None: ...
+    def cursor(
+        self,
+        query: str,
+        *args: t.Any,
+        prefetch: int | None = ...,
+        timeout: float | None = ...,
+        record_class: t.Type[Record] | None = ...,
+    ) -> t.AsyncIterable[Record]: ...
+    def transaction(self, *, isolation: str | None = ..., readonly: bool = ..., deferrable: bool = ...) -> Transaction: ...
+    def is_in_transaction(self) -> bool: ...
+    def get_server_pid(self) -> int: ...
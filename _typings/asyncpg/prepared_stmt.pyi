@@ -11,3 +11,6 @@ class PreparedStatement:
     ) -> Record | None: ...
     async def fetch(self, *args: t.Any, timeout: float | None = ...) -> list[Record]: ...
     async def executemany(self, args: t.Iterable[t.Any], *, timeout: float | None = ...) -> None: ...
+    def cursor(
+        self, *args: t.Any, prefetch: int | None = ..., timeout: float | None = ...
+    ) -> t.AsyncIterable[Record]: ...
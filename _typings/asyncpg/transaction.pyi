@@ -0,0 +1,14 @@
+import types as tp
+import typing as t
+
+class Transaction:
+    async def __aenter__(self) -> None: ...
+    async def __aexit__(
+        self,
+        exec_type: t.Type[BaseException] | None = ...,
+        exec: BaseException | None = ...,
+        tb: t.Type[tp.TracebackType] | None = ...,
+    ) -> None: ...
+    async def start(self) -> None: ...
+    async def commit(self) -> None: ...
+    async def rollback(self) -> None: ...
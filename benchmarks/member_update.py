@@ -0,0 +1,140 @@
+# -*- coding=utf-8 -*-
+"""Benchmark the per-event cost of comparing member states in the member update log.
+
+Compares the old comparison, which fetched the new member's roles over REST on every event and
+compared avatar urls, against `has_logged_changes` and `role_changes` from `ottbot.utils.members`.
+
+The REST request is simulated by building fresh role objects, as deserializing the response would,
+so the printed cost only covers CPU time. Each of those events also waited one round trip to Discord,
+which is counted separately.
+
+python -m benchmarks.member_update
+"""
+import asyncio
+import dataclasses
+import random
+import time
+import typing as t
+
+from ottbot.utils.members import has_logged_changes, role_changes
+
+EVENTS = 20_000
+GUILD_ROLES = 100
+MEMBER_ROLES = 8
+ROUNDS = 5
+# Share of events per change, everything else changes nothing that is logged (flags, pending, timeouts)
+MIX: dict[str, float] = {"roles": 0.1, "nickname": 0.05, "avatar": 0.02}
+
+
+@dataclasses.dataclass(frozen=True)
+class Role:
+    id: int
+    position: int
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+
+@dataclasses.dataclass
+class Member:
+    """The attributes of `hikari.Member` the listener reads."""
+
+    id: int
+    role_ids: list[int]
+    avatar_hash: str | None
+    guild_avatar_hash: str | None
+    nickname: str | None
+    username: str
+    discriminator: str
+    roles: dict[int, Role]
+
+    @property
+    def avatar_url(self) -> str | None:
+        return f"https://cdn.discordapp.com/avatars/{self.id}/{self.avatar_hash}.png" if self.avatar_hash else None
+
+    @property
+    def display_avatar_url(self) -> str:
+        if self.guild_avatar_hash:
+            return f"https://cdn.discordapp.com/guilds/0/users/{self.id}/avatars/{self.guild_avatar_hash}.png"
+        return self.avatar_url or f"https://cdn.discordapp.com/embed/avatars/{int(self.discriminator) % 5}.png"
+
+    def get_roles(self) -> list[Role]:
+        return [self.roles[role_id] for role_id in self.role_ids]
+
+    async def fetch_roles(self) -> list[Role]:
+        return [Role(role_id, self.roles[role_id].position) for role_id in self.role_ids]
+
+
+def _events(rng: random.Random) -> list[tuple[Member, Member]]:
+    roles = {role_id: Role(role_id, role_id) for role_id in range(GUILD_ROLES)}
+    events: list[tuple[Member, Member]] = []
+    for member_id in range(EVENTS):
+        old = Member(
+            member_id,
+            rng.sample(range(GUILD_ROLES), MEMBER_ROLES),
+            f"{rng.getrandbits(128):032x}",
+            None,
+            None,
+            f"user{member_id}",
+            f"{rng.randrange(10_000):04}",
+            roles,
+        )
+        new = dataclasses.replace(old, role_ids=list(old.role_ids))
+        change = rng.random()
+        for kind, share in MIX.items():
+            if change < share:
+                if kind == "roles":
+                    new.role_ids.append(rng.choice([r for r in range(GUILD_ROLES) if r not in old.role_ids]))
+                elif kind == "nickname":
+                    new.nickname = "nick"
+                else:
+                    new.avatar_hash = f"{rng.getrandbits(128):032x}"
+                break
+            change -= share
+        events.append((old, new))
+    return events
+
+
+async def before(old: Member, new: Member) -> bool:
+    changed = old.avatar_url != new.avatar_url or old.display_avatar_url != new.display_avatar_url
+    if (r1 := old.get_roles()) != (r2 := await new.fetch_roles()):
+        changed = bool(" ".join(r.mention for r in set(r1).symmetric_difference(r2))) or changed
+    return (
+        changed
+        or old.nickname != new.nickname
+        or old.username != new.username
+        or old.discriminator != new.discriminator
+    )
+
+
+async def after(old: Member, new: Member) -> bool:
+    if not has_logged_changes(old, new):  # type: ignore[arg-type]
+        return False
+    added, removed = role_changes(old, new)  # type: ignore[arg-type]
+    return bool(added or removed) or old.avatar_hash != new.avatar_hash or old.nickname != new.nickname
+
+
+async def measure(func: t.Callable[[Member, Member], t.Awaitable[bool]], events: list[tuple[Member, Member]]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for old, new in events:
+            await func(old, new)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main() -> None:
+    events = _events(random.Random(0))
+    logged = sum([await after(old, new) for old, new in events])
+    assert logged == sum([await before(old, new) for old, new in events])
+    print(f"{EVENTS:,} events, {logged:,} with logged changes")
+
+    for name, func, requests in (("fetch_roles", before, EVENTS), ("role_ids sets", after, 0)):
+        best = await measure(func, events)
+        print(f"{name:<14} {best / EVENTS * 1e9:>8,.0f} ns / event, {requests / EVENTS:.0f} REST requests / event")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+# -*- coding=utf-8 -*-
+"""Benchmark message command prefix resolution.
+
+Compares `PrefixIndex.resolve` against checking every prefix with `str.startswith`,
+which is what resolving from a list of per-guild prefixes would cost.
+
+python -m benchmarks.prefix_resolution
+"""
+import random
+import string
+import timeit
+
+from ottbot.utils.prefixes import PrefixIndex
+
+GUILDS = 10_000
+MESSAGES = 10_000
+COMMAND_RATIO = 0.1
+ROUNDS = 20
+
+
+def _random_prefix(rng: random.Random) -> str:
+    return "".join(rng.choices(string.punctuation, k=rng.randint(1, 3)))
+
+
+def main() -> None:
+    rng = random.Random(0)
+    guild_prefixes = {guild_id: (_random_prefix(rng),) for guild_id in range(GUILDS)}
+    global_prefixes = ("ott ", "o!")
+
+    index = PrefixIndex(global_prefixes)
+    for guild_id, prefixes in guild_prefixes.items():
+        index.set_guild(guild_id, prefixes)
+
+    words = ["hello", "what", "is", "up", "lol", "the", "bot", "anyone", "here", "?"]
+    messages: list[tuple[int, str]] = []
+    for _ in range(MESSAGES):
+        guild_id = rng.randrange(GUILDS)
+        content = " ".join(rng.choices(words, k=rng.randint(1, 12)))
+        if rng.random() < COMMAND_RATIO:
+            content = rng.choice(guild_prefixes[guild_id] + global_prefixes) + "ping"
+        messages.append((guild_id, content))
+
+    def naive() -> None:
+        for guild_id, content in messages:
+            [p for p in guild_prefixes[guild_id] + global_prefixes if content.startswith(p)]
+
+    def indexed() -> None:
+        for guild_id, content in messages:
+            index.resolve(guild_id, content)
+
+    for name, func in (("startswith per prefix", naive), ("PrefixIndex.resolve", indexed)):
+        best = min(timeit.repeat(func, number=1, repeat=ROUNDS))
+        print(f"{name:<24} {best / MESSAGES * 1e9:>8,.0f} ns / message")
+
+
+if __name__ == "__main__":
+    main()
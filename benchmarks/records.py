@@ -0,0 +1,112 @@
+# -*- coding=utf-8 -*-
+"""Benchmark attribute access and memory of database records.
+
+Compares the generated column properties of `AttrRecord` against the `__getattr__`
+fallback every access used to go through, plain `record["column"]` indexing and
+converting rows to `__slots__` dataclasses.
+
+asyncpg records can only be created by asyncpg, so this needs the database from the `DB_*` environment variables.
+Nothing is written, the rows are generated by the query.
+
+python -m benchmarks.records
+"""
+import asyncio
+import dataclasses
+import timeit
+import tracemalloc
+import typing as t
+
+import asyncpg
+
+from ottbot.config import DatabaseConfig
+from ottbot.db.records import GuildConfig
+
+ROWS = 10_000
+ROUNDS = 20
+
+QUERY = """SELECT
+    i AS id,
+    i * 7 AS guild_id,
+    'ott ' AS prefix,
+    NULLIF(i % 3, 0) * 11 AS welcome_channel_id,
+    'Welcome {user}!' AS welcome_message,
+    NULLIF(i % 2, 0) * 13 AS log_channel_id,
+    NULL::bigint AS starboard_channel_id
+FROM generate_series(1, $1) AS i"""
+
+
+class LegacyGuildConfig(asyncpg.Record):
+    """`GuildConfig` with only the `__getattr__` fallback, as it was before the generated properties."""
+
+    def __getattr__(self, __name: str, /) -> t.Any:
+        try:
+            return self[__name]
+        except Exception as e:
+            raise AttributeError(*e.args) from e
+
+
+@dataclasses.dataclass(slots=True)
+class GuildConfigRow:
+    id: int
+    guild_id: int
+    prefix: str
+    welcome_channel_id: int | None
+    welcome_message: str | None
+    log_channel_id: int | None
+    starboard_channel_id: int | None
+
+
+async def _fetch(conn: asyncpg.Connection, record_cls: type[asyncpg.Record]) -> tuple[list[t.Any], float]:
+    """Fetch the rows and measure how many bytes each one takes."""
+    tracemalloc.start()
+    rows = await conn.fetch(QUERY, ROWS, record_class=record_cls)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, size / ROWS
+
+
+async def main() -> None:
+    config = DatabaseConfig.from_env()
+    conn = await asyncpg.connect(
+        user=config.user, password=config.password, database=config.database, host=config.host, port=config.port
+    )
+    try:
+        legacy, legacy_size = await _fetch(conn, LegacyGuildConfig)
+        generated, generated_size = await _fetch(conn, GuildConfig)
+    finally:
+        await conn.close()
+
+    tracemalloc.start()
+    converted = [GuildConfigRow(**row) for row in generated]
+    converted_size = tracemalloc.get_traced_memory()[0] / ROWS + generated_size
+    tracemalloc.stop()
+
+    def access(rows: list[t.Any]) -> t.Callable[[], None]:
+        def run() -> None:
+            for row in rows:
+                row.guild_id, row.log_channel_id, row.welcome_message
+
+        return run
+
+    def index() -> None:
+        for row in generated:
+            row["guild_id"], row["log_channel_id"], row["welcome_message"]
+
+    def convert() -> None:
+        [GuildConfigRow(**row) for row in generated]
+
+    cases: list[tuple[str, t.Callable[[], None], float]] = [
+        ("__getattr__ (old)", access(legacy), legacy_size),
+        ("generated property", access(generated), generated_size),
+        ('record["column"]', index, generated_size),
+        ("slots dataclass", access(converted), converted_size),
+        ("  + conversion", convert, converted_size),
+    ]
+    print(f"{'':<20} {'3 attributes':>14} {'memory':>14}")
+    for name, func, size in cases:
+        best = min(timeit.repeat(func, number=1, repeat=ROUNDS))
+        print(f"{name:<20} {best / ROWS * 1e9:>8,.0f} ns/row {size:>8,.0f} B/row")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+# -*- coding=utf-8 -*-
+"""Benchmark the `/starboard top` queries on a guild with a large starboard.
+
+Runs the `StarboardService` leaderboard queries against temporary copies of the
+`starboard`, `starboard_daily` and `starboard_totals` tables, filled with a year of posts
+from one guild, and compares them to computing the author leaderboard straight from `starboard`.
+
+Needs the database from the `DB_*` environment variables with the migrations applied.
+Everything happens in a transaction that is rolled back, nothing is written.
+
+python -m benchmarks.starboard_leaderboard
+"""
+import asyncio
+import datetime
+import time
+
+import asyncpg
+
+from ottbot.config import DatabaseConfig
+from ottbot.db.starboard import StarboardService
+
+POSTS = 300_000
+AUTHORS = 5_000
+GUILD_ID = 1
+ROUNDS = 20
+LIMIT = 100
+
+SETUP = """
+CREATE TEMP TABLE starboard (LIKE starboard INCLUDING ALL) ON COMMIT DROP;
+CREATE TEMP TABLE starboard_daily (LIKE starboard_daily INCLUDING ALL) ON COMMIT DROP;
+CREATE TEMP TABLE starboard_totals (LIKE starboard_totals INCLUDING ALL) ON COMMIT DROP;
+
+INSERT INTO starboard (
+    original_channel_id, original_message_id, sent_channel_id, sent_message_id,
+    guild_id, author_id, created_at, star_count
+)
+SELECT
+    i % 50, i, 0, i,
+    -- Another guild of the same size, so the guild_id indexes have something to skip
+    {guild_id} + i % 2, (i * 7919) % {authors},
+    now() - (i % 365) * interval '1 day' - (i % 86400) * interval '1 second',
+    1 + (i * 31) % 40
+FROM generate_series(1, {posts} * 2) AS i;
+
+INSERT INTO starboard_daily (guild_id, day, author_id, stars, messages)
+SELECT guild_id, (created_at AT TIME ZONE 'UTC')::date, author_id, sum(star_count), count(*)
+FROM starboard GROUP BY 1, 2, 3;
+
+INSERT INTO starboard_totals (guild_id, author_id, stars, messages)
+SELECT guild_id, author_id, sum(stars), sum(messages) FROM starboard_daily GROUP BY 1, 2;
+
+ANALYZE starboard;
+ANALYZE starboard_daily;
+ANALYZE starboard_totals;
+"""
+
+SCAN_AUTHORS = """SELECT author_id, sum(star_count) AS stars, count(*) AS messages FROM starboard
+WHERE guild_id = $1 GROUP BY author_id ORDER BY stars DESC LIMIT $2"""
+
+
+async def _best(conn: asyncpg.Connection, q: str, *values: object) -> float:
+    """Best of `ROUNDS` runs of a query, in milliseconds."""
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await conn.fetch(q, *values)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+async def main() -> None:
+    config = DatabaseConfig.from_env()
+    conn = await asyncpg.connect(
+        user=config.user, password=config.password, database=config.database, host=config.host, port=config.port
+    )
+    now = datetime.datetime.now(datetime.timezone.utc)
+    week = now - datetime.timedelta(weeks=1)
+    month = now - datetime.timedelta(days=30)
+    try:
+        transaction = conn.transaction()
+        await transaction.start()
+        await conn.execute(SETUP.format(guild_id=GUILD_ID, authors=AUTHORS, posts=POSTS))
+
+        cases = [
+            ("top messages", StarboardService.TOP_MESSAGES, (GUILD_ID, LIMIT)),
+            ("top messages, week", StarboardService.TOP_MESSAGES_SINCE, (GUILD_ID, week, LIMIT)),
+            ("top messages, month", StarboardService.TOP_MESSAGES_SINCE, (GUILD_ID, month, LIMIT)),
+            ("top authors", StarboardService.TOP_AUTHORS, (GUILD_ID, LIMIT)),
+            ("top authors, week", StarboardService.TOP_AUTHORS_SINCE, (GUILD_ID, week.date(), LIMIT)),
+            ("top authors, month", StarboardService.TOP_AUTHORS_SINCE, (GUILD_ID, month.date(), LIMIT)),
+            ("top authors, scan (old)", SCAN_AUTHORS, (GUILD_ID, LIMIT)),
+        ]
+        print(f"{POSTS:,} posts by {AUTHORS:,} authors")
+        for name, q, values in cases:
+            print(f"{name:<24} {await _best(conn, q, *values):>8.2f} ms")
+        await transaction.rollback()
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
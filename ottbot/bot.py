@@ -1,5 +1,6 @@
 # -*- coding=utf-8 -*-
 """Create and configure different Discord bot types."""
+import logging
 import typing as t
 
 import hikari
@@ -8,10 +9,24 @@ import tanjun
 import yuyo
 
 from ottbot import config as config_
-from ottbot.db import AsyncPGDatabase
-from ottbot.db.records import GuildConfig
+from ottbot.db import (
+    AsyncPGDatabase,
+    GuildConfigService,
+    MemoryDatabase,
+    StarboardService,
+    WriteBehindQueue,
+)
+from ottbot.utils.audit_logs import AuditLogCache
+from ottbot.utils.diff import DiffEngine
+from ottbot.utils.dispatch import EventDispatcher
 from ottbot.utils.funcs import get_list_of_files
 from ottbot.utils.hooks import on_error, on_parser_error, pre_command
+from ottbot.utils.log_sink import LogSink
+from ottbot.utils.message_store import MessageStore
+from ottbot.utils.prefixes import PrefixIndex
+from ottbot.utils.starboard import StarboardBackfill, StarboardTracker
+
+logger = logging.getLogger(__name__)
 
 # https://stackoverflow.com/questions/7507825/where-is-a-complete-example-of-logging-config-dictconfig
 logging_config = {
@@ -51,6 +66,13 @@ def build_client(bot: hikari.GatewayBot, config: config_.FullConfig | None = Non
     return client
 
 
+def build_database(config: config_.DatabaseConfig) -> AsyncPGDatabase:
+    """Builds the database selected by `DatabaseConfig.backend`."""
+    if config.backend == "memory":
+        return MemoryDatabase(config)
+    return AsyncPGDatabase(config)
+
+
 def register_client_deps(
     bot: hikari.GatewayBot, client: tanjun.Client, config: config_.FullConfig | None = None
 ) -> tanjun.Client:
@@ -64,27 +86,48 @@ def register_client_deps(
 
     # Databases
     # redis_cache = sake.RedisCache(address=f"redis://{config.redis_host}", app=bot, event_manager=bot.event_manager)
-    database = AsyncPGDatabase(config.database)
+    database = build_database(config.database)
+    prefixes = PrefixIndex(config.prefixes)
+    guild_configs = GuildConfigService(database, prefixes)
+    audit_logs = AuditLogCache(bot.rest)
+    log_sink = LogSink(bot.rest)
+    diffs = DiffEngine()
+    dispatcher = EventDispatcher(max_concurrency=config.event_concurrency)
+    message_store = MessageStore(config.message_store, retention=config.message_retention)
+    writes = WriteBehindQueue(
+        database,
+        max_batch=config.database.write_batch_size,
+        flush_interval=config.database.write_flush_interval,
+    )
+    starboard_posts = StarboardService(database)
+    starboard = StarboardTracker(bot, starboard_posts, guild_configs)
+    backfill = StarboardBackfill(bot, database, starboard)
 
     # Command Prefix settings
-    client.add_prefix(config.prefixes)
-
-    async def prefix_getter(
-        ctx: tanjun.abc.MessageContext, db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase)
-    ) -> t.Iterable[str]:
-        """Get the prefix for a guild."""
-        if ctx.guild_id is None:
-            return []
-        if (
-            config := await db.row(
-                "SELECT * FROM guild_config WHERE guild_id = $1", ctx.guild_id, record_cls=GuildConfig
-            )
-        ) is not None:
-            return [config.prefix]
-        return []
+    # Global and guild prefixes both live in `prefixes`, which `guild_configs` keeps up to date.
+    # The getter takes no dependencies and does no I/O, so plain chat is rejected as cheaply as possible.
+    async def prefix_getter(ctx: tanjun.abc.MessageContext) -> t.Iterable[str]:
+        """Get the prefixes a message starts with."""
+        return prefixes.resolve(ctx.guild_id, ctx.content)
 
     client.set_prefix_getter(prefix_getter)
 
+    # Tanjun runs CLOSING callbacks concurrently, so anything that feeds another service closes before it
+    async def close_in_order() -> None:
+        """Let queued listeners and starboard updates finish, then flush what they wrote."""
+        for close in (
+            dispatcher.close,
+            backfill.close,
+            starboard.close,
+            message_store.close,
+            writes.close,
+            log_sink.close,
+        ):
+            try:
+                await close()
+            except Exception:
+                logger.exception(f"{close.__qualname__} failed while closing")
+
     # Client config
     (
         client.add_client_callback(tanjun.ClientCallbackNames.STARTING, component_client.open)
@@ -92,7 +135,17 @@ def register_client_deps(
         .add_client_callback(tanjun.ClientCallbackNames.STARTING, reaction_client.open)
         .add_client_callback(tanjun.ClientCallbackNames.CLOSING, reaction_client.close)
         .add_client_callback(tanjun.ClientCallbackNames.STARTING, database.connect)
-        .add_client_callback(tanjun.ClientCallbackNames.CLOSING, database.close)
+        .add_client_callback(tanjun.ClientCallbackNames.STARTING, writes.open)
+        .add_client_callback(tanjun.ClientCallbackNames.STARTING, message_store.open)
+        # Lets listeners that were already queued finish instead of dropping their log embeds and writes
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSING, close_in_order)
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSED, diffs.close)
+        # Pending writes are flushed while closing, so the pool may only close once every CLOSING callback finished
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSED, database.close)
+        # Needs the pool from `database.connect`, which is only guaranteed once every STARTING callback finished
+        .add_client_callback(tanjun.ClientCallbackNames.STARTED, guild_configs.open)
+        .add_client_callback(tanjun.ClientCallbackNames.STARTED, starboard_posts.open)
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSING, guild_configs.close)
         # .add_client_callback(tanjun.ClientCallbackNames.STARTING, redis_cache.open)
         # .add_client_callback(tanjun.ClientCallbackNames.CLOSING, redis_cache.close)
         # Dep injection
@@ -100,6 +153,17 @@ def register_client_deps(
         .set_type_dependency(yuyo.ReactionClient, reaction_client)
         # .set_type_dependency(sake.redis.RedisCache, redis_cache)
         .set_type_dependency(AsyncPGDatabase, database)
+        .set_type_dependency(GuildConfigService, guild_configs)
+        .set_type_dependency(WriteBehindQueue, writes)
+        .set_type_dependency(PrefixIndex, prefixes)
+        .set_type_dependency(AuditLogCache, audit_logs)
+        .set_type_dependency(LogSink, log_sink)
+        .set_type_dependency(MessageStore, message_store)
+        .set_type_dependency(DiffEngine, diffs)
+        .set_type_dependency(EventDispatcher, dispatcher)
+        .set_type_dependency(StarboardService, starboard_posts)
+        .set_type_dependency(StarboardTracker, starboard)
+        .set_type_dependency(StarboardBackfill, backfill)
         .set_type_dependency(config_.FullConfig, config)
     )
     client.load_modules(*get_list_of_files("./ottbot/modules"))
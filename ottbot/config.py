@@ -52,6 +52,12 @@ def _cast_or_else(
     raise KeyError(f"{key!r} required environment/config key missing")
 
 
+def _database_backend(value: typing.Any) -> typing.Literal["postgres", "memory"]:
+    if (value := str(value).lower()) not in ("postgres", "memory"):
+        raise ValueError(f"Unknown database backend {value!r}, expected 'postgres' or 'memory'")
+    return typing.cast(typing.Literal["postgres", "memory"], value)
+
+
 class Config(abc.ABC):
     """Abstract class that holds configuration data."""
 
@@ -79,7 +85,25 @@ class DatabaseConfig(Config):
     database: str = "postgres"
     host: str = "localhost"
     port: int = 5432
-    schema: str = "./ottbot/data/static/schema.sql"
+    migrations: str = "./ottbot/data/migrations"
+    backend: typing.Literal["postgres", "memory"] = "postgres"
+    """`memory` swaps postgres for an in-process SQLite database, so the bot can run without any services."""
+    memory_latency: float = 0.0
+    """Seconds every statement of the memory backend waits before running, to simulate a network round trip."""
+    statement_cache_size: int = 256
+    stream_prefetch: int = 100
+    """Rows `AsyncPGDatabase.stream` reads from its cursor per round trip."""
+    min_pool_size: int = 10
+    max_pool_size: int = 10
+    max_queries: int = 50000
+    max_inactive_connection_lifetime: float = 300.0
+    acquire_timeout: float = 10.0
+    """Seconds to wait for a pool connection before giving up, 0 waits forever."""
+    shed_when_saturated: bool = False
+    """Whether listeners should skip non-critical work while every pool connection is busy."""
+    write_batch_size: int = 500
+    """Pending write-behind writes that trigger a flush before the interval ends."""
+    write_flush_interval: float = 1.0
 
     @classmethod
     def from_env(cls: type[ConfigT]) -> ConfigT:
@@ -93,7 +117,23 @@ class DatabaseConfig(Config):
             database=_cast_or_else(mapping, "DB_NAME", str, "postgres"),
             host=_cast_or_else(mapping, "DB_HOST", str, "localhost"),
             port=_cast_or_else(mapping, "DB_PORT", int, 5432),
-            schema=_cast_or_else(mapping, "DB_SCHEMA", str, "./ottbot/data/static/schema.sql"),
+            migrations=_cast_or_else(mapping, "DB_MIGRATIONS", str, "./ottbot/data/migrations"),
+            backend=_cast_or_else(mapping, "DB_BACKEND", _database_backend, "postgres"),
+            memory_latency=_cast_or_else(mapping, "DB_MEMORY_LATENCY", float, 0.0),
+            statement_cache_size=_cast_or_else(mapping, "DB_STATEMENT_CACHE_SIZE", int, 256),
+            stream_prefetch=_cast_or_else(mapping, "DB_STREAM_PREFETCH", int, 100),
+            min_pool_size=_cast_or_else(mapping, "DB_MIN_POOL_SIZE", int, 10),
+            max_pool_size=_cast_or_else(mapping, "DB_MAX_POOL_SIZE", int, 10),
+            max_queries=_cast_or_else(mapping, "DB_MAX_QUERIES", int, 50000),
+            max_inactive_connection_lifetime=_cast_or_else(
+                mapping, "DB_MAX_INACTIVE_CONNECTION_LIFETIME", float, 300.0
+            ),
+            acquire_timeout=_cast_or_else(mapping, "DB_ACQUIRE_TIMEOUT", float, 10.0),
+            shed_when_saturated=_cast_or_else(
+                mapping, "DB_SHED_WHEN_SATURATED", lambda v: str(v).lower() in ("1", "true", "yes"), False
+            ),
+            write_batch_size=_cast_or_else(mapping, "DB_WRITE_BATCH_SIZE", int, 500),
+            write_flush_interval=_cast_or_else(mapping, "DB_WRITE_FLUSH_INTERVAL", float, 1.0),
         )
 
 
@@ -142,11 +182,18 @@ class FullConfig(Config):
     lavalink_password: str | None
     redis_host: str
     emoji_guild: hikari.Snowflake | None = None
+    message_store: str = "./ottbot/data/messages.sqlite3"
+    message_retention: int = 1000
+    event_concurrency: int = 32
     intents: hikari.Intents = DEFAULT_INTENTS
     log_level: int | str = logging.INFO
     mention_prefix: bool = True
     owner_only: bool = False
     prefixes: collections.Set[str] = frozenset()
+    """Global message command prefixes.
+
+    The `prefixes` env var separates them with commas and keeps any whitespace, so `ott ,!` means `"ott "` and `"!"`.
+    """
     declare_global_commands: typing.Union[bool, hikari.Snowflake] = True
 
     @classmethod
@@ -160,15 +207,23 @@ class FullConfig(Config):
             redis_host=_cast_or_else(os.environ, "REDIS_HOST", str, "localhost"),
             database=DatabaseConfig.from_env(),
             emoji_guild=_cast_or_else(os.environ, "emoji_guild", hikari.Snowflake, None),
+            message_store=_cast_or_else(os.environ, "MESSAGE_STORE_PATH", str, "./ottbot/data/messages.sqlite3"),
+            message_retention=_cast_or_else(os.environ, "MESSAGE_STORE_RETENTION", int, 1000),
+            event_concurrency=_cast_or_else(os.environ, "EVENT_CONCURRENCY", int, 32),
             intents=_cast_or_else(os.environ, "intents", hikari.Intents, DEFAULT_INTENTS),
             log_level=_cast_or_else(os.environ, "log_level", lambda v: int(v) if v.isdigit() else v, logging.INFO),
             mention_prefix=_cast_or_else(os.environ, "mention_prefix", bool, True),
             owner_only=_cast_or_else(os.environ, "owner_only", bool, False),
-            prefixes=_cast_or_else(os.environ, "prefixes", lambda v: frozenset(map(str, v)), frozenset[str]()),
+            prefixes=_cast_or_else(
+                os.environ,
+                "prefixes",
+                lambda v: frozenset(filter(None, v.split(","))),
+                frozenset[str](),
+            ),
             tokens=Tokens.from_env(),
             declare_global_commands=_cast_or_else(
                 os.environ, "declare_global_commands", lambda v: v if isinstance(v, bool) else hikari.Snowflake(v), True
-            ),  # TODO: Allow for mult-character prefixes
+            ),
         )
 
     @classmethod
@@ -191,6 +246,9 @@ class FullConfig(Config):
             lavalink_host=_cast_or_else(mapping, "lavalink_host", str, "localhost"),
             lavalink_password=_cast_or_else(mapping, "lavalink_password", str, None),
             emoji_guild=_cast_or_else(mapping, "emoji_guild", hikari.Snowflake, None),
+            message_store=_cast_or_else(mapping, "message_store", str, "./ottbot/data/messages.sqlite3"),
+            message_retention=_cast_or_else(mapping, "message_retention", int, 1000),
+            event_concurrency=_cast_or_else(mapping, "event_concurrency", int, 32),
             intents=_cast_or_else(mapping, "intents", hikari.Intents, DEFAULT_INTENTS),
             log_level=log_level,
             mention_prefix=bool(mapping.get("mention_prefix", True)),
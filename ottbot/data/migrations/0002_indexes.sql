@@ -0,0 +1,5 @@
+-- Lookups done on every reaction and autorole interaction
+
+CREATE INDEX IF NOT EXISTS starboard_original_message_id_idx ON starboard (original_message_id);
+
+CREATE INDEX IF NOT EXISTS auto_roles_guild_id_idx ON auto_roles (guild_id);
@@ -0,0 +1,10 @@
+-- Progress of `/starboard backfill`, so a scan resumes where it stopped
+
+CREATE TABLE IF NOT EXISTS starboard_backfill (
+    channel_id bigint NOT NULL PRIMARY KEY,
+    guild_id bigint NOT NULL,
+    last_message_id bigint NOT NULL,
+    scanned bigint NOT NULL DEFAULT 0,
+    posted bigint NOT NULL DEFAULT 0,
+    completed_at timestamp with time zone
+);
@@ -0,0 +1,29 @@
+-- Leaderboards of `/starboard top`, posts from before this migration are filled in when their star count next changes
+
+ALTER TABLE starboard ADD COLUMN guild_id bigint;
+ALTER TABLE starboard ADD COLUMN author_id bigint;
+ALTER TABLE starboard ADD COLUMN created_at timestamp with time zone;
+ALTER TABLE starboard ADD COLUMN star_count integer NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS starboard_guild_id_star_count_idx ON starboard (guild_id, star_count DESC);
+CREATE INDEX IF NOT EXISTS starboard_guild_id_created_at_idx ON starboard (guild_id, created_at);
+
+-- Stars and starred messages of an author, by the day the messages were sent
+CREATE TABLE IF NOT EXISTS starboard_daily (
+    guild_id bigint NOT NULL,
+    day date NOT NULL,
+    author_id bigint NOT NULL,
+    stars bigint NOT NULL DEFAULT 0,
+    messages bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, day, author_id)
+);
+
+CREATE TABLE IF NOT EXISTS starboard_totals (
+    guild_id bigint NOT NULL,
+    author_id bigint NOT NULL,
+    stars bigint NOT NULL DEFAULT 0,
+    messages bigint NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, author_id)
+);
+
+CREATE INDEX IF NOT EXISTS starboard_totals_guild_id_stars_idx ON starboard_totals (guild_id, stars DESC);
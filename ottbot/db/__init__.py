@@ -1,6 +1,27 @@
 # -*- coding=utf-8 -*-
 """Database handler for a postgres database."""
-from .db import AsyncPGDatabase
+from .db import AsyncPGDatabase, DatabaseSession, PoolTimeoutError
+from .guild_config import GuildConfigService
+from .memory import MemoryDatabase, MemoryRecord
 from .records import AutoRole, Currency, GuildConfig, Starboard, User
+from .starboard import StarboardPost, StarboardService, StarredAuthor, StarredMessage
+from .write_behind import WriteBehindQueue
 
-__all__ = ["AsyncPGDatabase", "AutoRole", "Currency", "GuildConfig", "User", "Starboard"]
+__all__ = [
+    "AsyncPGDatabase",
+    "AutoRole",
+    "Currency",
+    "DatabaseSession",
+    "GuildConfig",
+    "GuildConfigService",
+    "MemoryDatabase",
+    "MemoryRecord",
+    "PoolTimeoutError",
+    "User",
+    "Starboard",
+    "StarboardPost",
+    "StarboardService",
+    "StarredAuthor",
+    "StarredMessage",
+    "WriteBehindQueue",
+]
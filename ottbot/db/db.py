@@ -1,36 +1,115 @@
 # -*- coding=utf-8 -*-
 """Simple Database driver for the postgres database."""
 import asyncio
+import collections
+import contextlib
+import functools
+import logging
+import time
 import typing as t
 
 import aiofiles
 import asyncpg
+from asyncpg.exceptions import InterfaceError, PostgresError
 from asyncpg.pool import PoolConnectionProxy
 
 from ottbot import config as config_
 
+from . import migrations
+from .stats import QueryStats
+
 _P = t.ParamSpec("_P")
 _R = t.TypeVar("_R")
 
 Self = t.TypeVar("Self", bound="AsyncPGDatabase")
 Rec = t.TypeVar("Rec", bound=asyncpg.Record)
 
+logger = logging.getLogger(__name__)
+
+LISTEN_HEALTH_CHECK: t.Final[float] = 30.0
+"""Seconds between health checks of an idle `AsyncPGDatabase.listen` connection."""
+
+
+def _count_rows(result: t.Any) -> int:
+    """Number of rows returned by a query method."""
+    if isinstance(result, list):
+        return len(t.cast(list[t.Any], result))
+    return int(result is not None)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pool connection became available within `DatabaseConfig.acquire_timeout`."""
+
 
 class AsyncPGDatabase:
     """Wrapper class for AsyncPG Database access."""
 
-    __slots__ = ("calls", "user", "password", "db", "host", "port", "schema", "pool")
+    __slots__ = (
+        "calls",
+        "config",
+        "user",
+        "password",
+        "db",
+        "host",
+        "port",
+        "migrations",
+        "pool",
+        "statement_cache_hits",
+        "statement_cache_misses",
+        "stats",
+        "waiting",
+        "_prepared",
+    )
 
     def __init__(self, config: config_.DatabaseConfig) -> None:
         """Create a new Database handler."""
         self.calls: int = 0
+        self.config: config_.DatabaseConfig = config
         self.user: str = config.user
         self.password: str = config.password
         self.db: str = config.database
         self.host: str = config.host
         self.port: int = config.port
-        self.schema: str = "./ottbot/data/static/schema.sql"
+        self.migrations: str = config.migrations
         self.pool: asyncpg.Pool | None = None
+        self.statement_cache_hits: int = 0
+        """Number of queries that reused a statement asyncpg had already prepared on their connection."""
+        self.statement_cache_misses: int = 0
+        """Number of queries that had to prepare a new statement."""
+        self._prepared: collections.OrderedDict[
+            int, collections.OrderedDict[tuple[str, t.Type[asyncpg.Record] | None], None]
+        ] = collections.OrderedDict()
+        """Queries asyncpg should have cached, per server process id of a connection, least recently used first."""
+        self.stats: QueryStats = QueryStats()
+        self.waiting: int = 0
+        """Number of callers currently waiting for a pool connection."""
+
+    @property
+    def saturated(self) -> bool:
+        """Whether every pool connection is in use and the pool can't grow any further."""
+        if self.pool is None:
+            return False
+        return self.waiting > 0 or (
+            self.pool.get_idle_size() == 0 and self.pool.get_size() >= self.pool.get_max_size()
+        )
+
+    def should_shed(self) -> bool:
+        """Whether non-critical work, like log embeds, should be skipped right now.
+
+        Always `False` unless `DatabaseConfig.shed_when_saturated` is enabled.
+        """
+        return self.config.shed_when_saturated and self.saturated
+
+    def pool_metrics(self) -> dict[str, int]:
+        """Current pool size, idle connections and queue depth."""
+        if self.pool is None:
+            return {"size": 0, "idle": 0, "max_size": self.config.max_pool_size, "waiting": self.waiting}
+        return {
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "max_size": self.pool.get_max_size(),
+            "waiting": self.waiting,
+        }
 
     async def connect(self) -> None:
         """Opens a connection pool."""
@@ -40,10 +119,15 @@ class AsyncPGDatabase:
             port=self.port,
             database=self.db,
             password=self.password,
+            min_size=self.config.min_pool_size,
+            max_size=self.config.max_pool_size,
+            max_queries=self.config.max_queries,
+            max_inactive_connection_lifetime=self.config.max_inactive_connection_lifetime,
+            statement_cache_size=self.config.statement_cache_size,
             loop=asyncio.get_running_loop(),
         )
 
-        await self.scriptexec(self.schema)
+        await self.migrate()
 
     async def close(self) -> None:
         """Closes the connection pool."""
@@ -56,15 +140,160 @@ class AsyncPGDatabase:
     ) -> t.Callable[t.Concatenate[Self, _P], t.Awaitable[_R]]:
         """A decorator used to acquire a connection from the pool."""
 
+        @functools.wraps(func)
         async def wrapper(_self: Self, *args: _P.args, **kwargs: _P.kwargs) -> _R:
-            if _self.pool is None:
-                raise ValueError("Not connected to database.")
-            async with _self.pool.acquire() as conn:
-                _self.calls += 1
-                return await func(_self, conn, *args, **kwargs)
+            async with _self.acquire() as conn:
+                return await _self.call(func, conn, *args, **kwargs)
 
         return wrapper
 
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> t.AsyncIterator[PoolConnectionProxy]:
+        """Acquire a pool connection, waiting at most `DatabaseConfig.acquire_timeout` seconds."""
+        if self.pool is None:
+            raise ValueError("Not connected to database.")
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            conn = await self.pool.acquire(timeout=self.config.acquire_timeout or None)
+        except asyncio.TimeoutError as e:
+            raise PoolTimeoutError(
+                f"No connection available after {self.config.acquire_timeout}s, {self.waiting} callers waiting"
+            ) from e
+        finally:
+            self.waiting -= 1
+            self.stats.record_acquire(time.perf_counter() - started)
+
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    async def call(
+        self: Self,
+        func: t.Callable[t.Concatenate[Self, PoolConnectionProxy, _P], t.Awaitable[_R]],
+        conn: PoolConnectionProxy,
+        *args: _P.args,
+        **kwargs: _P.kwargs,
+    ) -> _R:
+        """Run an undecorated query method on a connection that has already been acquired."""
+        self.calls += 1
+        return await func(self, conn, *args, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def session(self, *, transaction: bool = False) -> t.AsyncIterator["DatabaseSession"]:
+        """Run several queries on a single pooled connection.
+
+        ```python
+        async with db.session(transaction=True) as session:
+            await session.execute("INSERT INTO guild_config (guild_id) VALUES ($1)", guild_id)
+            config = await session.row("SELECT * FROM guild_config WHERE guild_id = $1", guild_id)
+        ```
+        """
+        async with self.acquire() as conn:
+            if not transaction:
+                yield DatabaseSession(self, conn)
+                return
+            async with conn.transaction():
+                yield DatabaseSession(self, conn)
+
+    async def listen(
+        self,
+        channel: str,
+        callback: t.Callable[[str], None],
+        *,
+        on_reconnect: t.Callable[[], t.Awaitable[None]] | None = None,
+    ) -> None:
+        """Call `callback` with the payload of every `NOTIFY` on `channel`, until cancelled.
+
+        Listens on a dedicated connection outside of the pool, which is health checked every
+        `LISTEN_HEALTH_CHECK` seconds and re-established with backoff when it drops.
+        Notifications sent while disconnected are lost, so `on_reconnect` is awaited once
+        listening again after any failed or dropped connection, to let the caller catch up.
+
+        ```python
+        task = asyncio.create_task(db.listen("guild_config", on_notify, on_reconnect=reload))
+        ```
+        """
+        delay = 1.0
+        reconnecting = False
+        while True:
+            conn: asyncpg.Connection | None = None
+            try:
+                conn = await asyncpg.connect(
+                    user=self.user, password=self.password, database=self.db, host=self.host, port=self.port
+                )
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(channel, lambda _conn, _pid, _channel, payload: callback(payload))
+                if reconnecting and on_reconnect is not None:
+                    await on_reconnect()
+                delay = 1.0
+
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=LISTEN_HEALTH_CHECK)
+                    except asyncio.TimeoutError:
+                        await conn.fetchval("SELECT 1", timeout=LISTEN_HEALTH_CHECK)
+                logger.warning(f"LISTEN connection for {channel!r} closed, reconnecting")
+            except (OSError, asyncio.TimeoutError, PostgresError, InterfaceError) as e:
+                logger.warning(f"LISTEN connection for {channel!r} failed, retrying in {delay}s: {e!r}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+            reconnecting = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def _run(
+        self,
+        conn: PoolConnectionProxy,
+        q: str,
+        record_cls: t.Type[asyncpg.Record] | None,
+        callback: t.Callable[[], t.Awaitable[_R]],
+    ) -> _R:
+        """Run `callback`, which runs `q` on `conn`, and record its statistics.
+
+        Statements are prepared and cached per connection by asyncpg (`DatabaseConfig.statement_cache_size`),
+        which also re-prepares them after a schema change.
+        """
+        self._count_statement(conn, q, record_cls)
+        started = time.perf_counter()
+        try:
+            result = await callback()
+        except Exception:
+            self.stats.record(q, time.perf_counter() - started, error=True)
+            raise
+
+        self.stats.record(q, time.perf_counter() - started, _count_rows(result))
+        return result
+
+    def _count_statement(self, conn: PoolConnectionProxy, q: str, record_cls: t.Type[asyncpg.Record] | None) -> None:
+        """Count a statement cache hit or miss.
+
+        asyncpg doesn't expose its cache, so this keeps a least recently used list of the same size for each
+        connection. Statements asyncpg drops for other reasons, like a schema change, are still counted as hits.
+        """
+        if not (size := self.config.statement_cache_size):
+            return
+        if (queries := self._prepared.get(pid := conn.get_server_pid())) is None:
+            queries = self._prepared[pid] = collections.OrderedDict()
+            # Forget connections the pool closed since
+            if len(self._prepared) > 2 * self.config.max_pool_size:
+                self._prepared.popitem(last=False)
+        self._prepared.move_to_end(pid)
+
+        if (key := (q, record_cls)) in queries:
+            queries.move_to_end(key)
+            self.statement_cache_hits += 1
+            return
+        queries[key] = None
+        if len(queries) > size:
+            queries.popitem(last=False)
+        self.statement_cache_misses += 1
+
     @with_connection
     async def fetch(
         self, conn: PoolConnectionProxy, q: str, *values: t.Any, record_cls: t.Type[Rec] = asyncpg.Record
@@ -73,8 +302,7 @@ class AsyncPGDatabase:
 
         SELECT username FROM users WHERE id=1
         """
-        query = await conn.prepare(q, record_class=record_cls)
-        return await query.fetchval(*values)
+        return await self._run(conn, q, record_cls, lambda: conn.fetchval(q, *values))
 
     @with_connection
     async def row(
@@ -88,8 +316,7 @@ class AsyncPGDatabase:
 
         SELECT * FROM users WHERE id=1
         """
-        query = await conn.prepare(q, record_class=record_cls)
-        return await query.fetchrow(*values)
+        return await self._run(conn, q, record_cls, lambda: conn.fetchrow(q, *values, record_class=record_cls))
 
     @with_connection
     async def rows(
@@ -103,8 +330,7 @@ class AsyncPGDatabase:
 
         SELECT * FROM users
         """
-        query = await conn.prepare(q, record_class=record_cls)
-        return await query.fetch(*values)
+        return await self._run(conn, q, record_cls, lambda: conn.fetch(q, *values, record_class=record_cls))
 
     @with_connection
     async def column(
@@ -118,8 +344,8 @@ class AsyncPGDatabase:
 
         SELECT username FROM users
         """
-        query = await conn.prepare(q, record_class=record_cls)
-        return [r[0] for r in await query.fetch(*values)]
+        rows = await self._run(conn, q, record_cls, lambda: conn.fetch(q, *values, record_class=record_cls))
+        return [r[0] for r in rows]
 
     @with_connection
     async def execute(
@@ -133,8 +359,7 @@ class AsyncPGDatabase:
 
         UPDATE users SET bal=10 WHERE id=1
         """
-        query = await conn.prepare(q, record_class=record_cls)
-        await query.fetch(*values)
+        await self._run(conn, q, record_cls, lambda: conn.fetch(q, *values, record_class=record_cls))
 
     @with_connection
     async def executemany(
@@ -145,11 +370,191 @@ class AsyncPGDatabase:
         record_cls: t.Type[Rec] | None = None,
     ) -> None:
         """Execute a write operation for each set of values."""
-        query = await conn.prepare(q, record_class=record_cls)
-        await query.executemany(values)
+        await self._run(conn, q, record_cls, lambda: conn.executemany(q, values))
+
+    @with_connection
+    async def upsert_many(
+        self,
+        conn: PoolConnectionProxy,
+        table: str,
+        columns: t.Mapping[str, str],
+        values: t.Iterable[t.Sequence[t.Any]],
+        *,
+        conflict: t.Sequence[str] = (),
+        update: t.Sequence[str] = (),
+        record_cls: t.Type[Rec] | None = None,
+    ) -> t.List[Rec]:
+        """Insert many rows with a single statement, returning the rows that were written.
+
+        `columns` maps each column to its postgres type. The values are sent as one array
+        per column and expanded server side with `unnest`, so the statement text (and its
+        prepared statement) is the same no matter how many rows are written.
+        Conflicting rows are skipped unless `update` names columns to overwrite.
+
+        INSERT INTO guild_config (guild_id) SELECT * FROM unnest($1::bigint[]) ON CONFLICT DO NOTHING RETURNING *
+        """
+        names = ", ".join(columns)
+        arrays = ", ".join(f"${i}::{type_}[]" for i, type_ in enumerate(columns.values(), start=1))
+        q = f"INSERT INTO {table} ({names}) SELECT * FROM unnest({arrays}) ON CONFLICT"  # noqa: S608
+        if conflict:
+            q += f" ({', '.join(conflict)})"
+        if update:
+            q += f" DO UPDATE SET {', '.join(f'{column} = EXCLUDED.{column}' for column in update)}"
+        else:
+            q += " DO NOTHING"
+        q += " RETURNING *"
+
+        arguments = [list(column) for column in zip(*values)] or [[] for _ in columns]
+        return await self._run(conn, q, record_cls, lambda: conn.fetch(q, *arguments, record_class=record_cls))
+
+    async def stream(
+        self,
+        q: str,
+        *values: t.Any,
+        prefetch: int | None = None,
+        record_cls: t.Type[Rec] | None = None,
+    ) -> t.AsyncIterator[Rec]:
+        """Iterate over the rows of a query without loading them all into memory.
+
+        Rows are read through a server side cursor, `prefetch` rows at a time
+        (`DatabaseConfig.stream_prefetch` by default). The cursor needs a transaction,
+        so a pool connection is held until the iteration ends. Wrap the iterator in
+        `contextlib.aclosing` when breaking out of it early, so it's released straight away.
+
+        ```python
+        async with contextlib.aclosing(db.stream("SELECT * FROM currency ORDER BY balance DESC")) as rows:
+            async for row in rows:
+                ...
+        ```
+        """
+        async with self.acquire() as conn, conn.transaction():
+            self.calls += 1
+            started = time.perf_counter()
+            rows = 0
+            error = False
+            try:
+                cursor = conn.cursor(
+                    q, *values, prefetch=prefetch or self.config.stream_prefetch, record_class=record_cls
+                )
+                async for record in cursor:
+                    rows += 1
+                    yield record
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.stats.record(q, time.perf_counter() - started, rows, error=error)
+
+    async def paginate(
+        self,
+        table: str,
+        *values: t.Any,
+        where: str | None = None,
+        key: str = "id",
+        page_size: int = 50,
+        descending: bool = False,
+        record_cls: t.Type[Rec] | None = None,
+    ) -> t.AsyncIterator[t.List[Rec]]:
+        """Iterate over the rows of a table a page at a time, ordered by `key`.
+
+        Every page is its own query that continues after the last key of the previous page
+        (keyset pagination), so later pages are as cheap as the first one and no connection
+        is held between pages. `key` must be unique and indexed, like the primary key.
+        `where` may use `values` as `$1`, `$2`, ...
+
+        ```python
+        async for page in db.paginate("starboard", channel_id, where="original_channel_id = $1"):
+            ...
+        ```
+        """
+        comparison, order = ("<", "DESC") if descending else (">", "ASC")
+        conditions = [f"({where})"] if where else []
+        after = len(values) + 1
+
+        def query(*extra: str) -> str:
+            q = f"SELECT * FROM {table}"  # noqa: S608
+            if clauses := conditions + list(extra):
+                q += f" WHERE {' AND '.join(clauses)}"
+            return q + f" ORDER BY {key} {order} LIMIT ${after + len(extra)}"
+
+        first_page, next_page = query(), query(f"{key} {comparison} ${after}")
+        page = list(await self.rows(first_page, *values, page_size, record_cls=record_cls))
+        while page:
+            yield page
+            if len(page) < page_size:
+                return
+            page = list(await self.rows(next_page, *values, page[-1][key], page_size, record_cls=record_cls))
+
+    @with_connection
+    async def migrate(self, conn: PoolConnectionProxy) -> None:
+        """Apply any migrations the database hasn't seen yet."""
+        if applied := await migrations.migrate(conn, self.migrations):
+            logger.info(f"Applied migrations {', '.join(f'{m.version:04}_{m.name}' for m in applied)}")
 
     @with_connection
     async def scriptexec(self, conn: PoolConnectionProxy, path: str) -> None:
         """Execute an sql script at a given path."""
         async with aiofiles.open(path, "r", encoding="utf-8") as script:
             await conn.execute((await script.read()))
+        # Scripts can alter tables, asyncpg only re-prepares stale statements outside of transactions
+        if self.pool is not None:
+            await self.pool.expire_connections()
+
+
+def _unwrap_method(method: t.Callable[..., t.Awaitable[_R]]) -> t.Callable[..., t.Awaitable[_R]]:
+    """Get the original function of a method decorated with `AsyncPGDatabase.with_connection`."""
+    return t.cast(t.Callable[..., t.Awaitable[_R]], getattr(method, "__wrapped__"))
+
+
+class DatabaseSession:
+    """Database helpers bound to a single connection, created by `AsyncPGDatabase.session`."""
+
+    __slots__ = ("db", "conn")
+
+    def __init__(self, db: AsyncPGDatabase, conn: PoolConnectionProxy) -> None:
+        """Create a new session, use `AsyncPGDatabase.session` instead."""
+        self.db: AsyncPGDatabase = db
+        self.conn: PoolConnectionProxy = conn
+
+    async def fetch(self, q: str, *values: t.Any, record_cls: t.Type[Rec] = asyncpg.Record) -> t.Optional[Rec]:
+        return await self.db.call(_unwrap_method(AsyncPGDatabase.fetch), self.conn, q, *values, record_cls=record_cls)
+
+    async def row(self, q: str, *values: t.Any, record_cls: t.Type[Rec] | None = None) -> Rec | None:
+        return await self.db.call(_unwrap_method(AsyncPGDatabase.row), self.conn, q, *values, record_cls=record_cls)
+
+    async def rows(self, q: str, *values: t.Any, record_cls: t.Type[Rec] | None = None) -> t.Iterable[Rec]:
+        return await self.db.call(_unwrap_method(AsyncPGDatabase.rows), self.conn, q, *values, record_cls=record_cls)
+
+    async def column(self, q: str, *values: t.Any, record_cls: t.Type[Rec] | None = None) -> t.List[Rec]:
+        return await self.db.call(
+            _unwrap_method(AsyncPGDatabase.column), self.conn, q, *values, record_cls=record_cls
+        )
+
+    async def execute(self, q: str, *values: t.Any, record_cls: t.Type[Rec] | None = None) -> None:
+        await self.db.call(_unwrap_method(AsyncPGDatabase.execute), self.conn, q, *values, record_cls=record_cls)
+
+    async def executemany(
+        self, q: str, values: t.List[t.Iterable[t.Any]], record_cls: t.Type[Rec] | None = None
+    ) -> None:
+        await self.db.call(_unwrap_method(AsyncPGDatabase.executemany), self.conn, q, values, record_cls=record_cls)
+
+    async def upsert_many(
+        self,
+        table: str,
+        columns: t.Mapping[str, str],
+        values: t.Iterable[t.Sequence[t.Any]],
+        *,
+        conflict: t.Sequence[str] = (),
+        update: t.Sequence[str] = (),
+        record_cls: t.Type[Rec] | None = None,
+    ) -> t.List[Rec]:
+        return await self.db.call(
+            _unwrap_method(AsyncPGDatabase.upsert_many),
+            self.conn,
+            table,
+            columns,
+            values,
+            conflict=conflict,
+            update=update,
+            record_cls=record_cls,
+        )
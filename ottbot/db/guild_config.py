@@ -0,0 +1,216 @@
+# -*- coding=utf-8 -*-
+"""In-memory guild configuration backed by the `guild_config` table."""
+import asyncio
+import logging
+import time
+import typing as t
+import uuid
+
+import hikari
+
+from ottbot.utils.prefixes import PrefixIndex
+
+from .db import AsyncPGDatabase
+from .records import GuildConfig
+
+__all__ = ("GuildConfigService",)
+
+GuildIdT = int | hikari.Snowflake
+
+logger = logging.getLogger(__name__)
+
+
+class GuildConfigService:
+    """Serves `GuildConfig` rows from memory and writes changes through to the database.
+
+    Every row is loaded once at startup, afterwards reads only touch the database
+    for guilds that weren't known at load time. If a `PrefixIndex` is given, it is
+    kept in sync with the cached prefixes.
+
+    Every bot process has its own cache. `update` publishes the changed guild on the
+    `guild_config` channel with `NOTIFY`, and every other process re-reads just that guild.
+    """
+
+    __slots__ = (
+        "db",
+        "prefixes",
+        "node_id",
+        "hits",
+        "misses",
+        "writes",
+        "invalidations",
+        "loaded_at",
+        "_configs",
+        "_fetched_at",
+        "_listener",
+        "_refreshing",
+    )
+
+    CHANNEL: t.Final[str] = "guild_config"
+    """Channel config changes are published on, the payload is `<node id>:<guild id>`."""
+
+    COLUMNS: t.Final[frozenset[str]] = frozenset(
+        {"prefix", "welcome_channel_id", "welcome_message", "log_channel_id", "starboard_channel_id"}
+    )
+    """Columns that can be changed through `GuildConfigService.update`."""
+
+    def __init__(self, db: AsyncPGDatabase, prefixes: PrefixIndex | None = None) -> None:
+        """Create a new guild config service."""
+        self.db: AsyncPGDatabase = db
+        self.prefixes: PrefixIndex | None = prefixes
+        self.node_id: str = uuid.uuid4().hex[:12]
+        """Identifies this process, so it ignores its own notifications."""
+        self.hits: int = 0
+        self.misses: int = 0
+        self.writes: int = 0
+        self.invalidations: int = 0
+        self.loaded_at: float | None = None
+        self._configs: dict[int, GuildConfig] = {}
+        self._fetched_at: dict[int, float] = {}
+        self._listener: asyncio.Task[None] | None = None
+        self._refreshing: set[asyncio.Task[GuildConfig | None]] = set()
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def __contains__(self, guild_id: GuildIdT) -> bool:
+        return int(guild_id) in self._configs
+
+    async def open(self) -> None:
+        """Load every guild config and start listening for changes made by other processes."""
+        await self.load()
+        if self._listener is None:
+            self._listener = asyncio.create_task(self.db.listen(self.CHANNEL, self._on_notify, on_reconnect=self.load))
+
+    async def close(self) -> None:
+        """Stop listening for changes."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _on_notify(self, payload: str) -> None:
+        node_id, _, guild_id = payload.partition(":")
+        if node_id == self.node_id:
+            return
+
+        self.invalidations += 1
+        # Refreshed rather than evicted, the prefix index only knows about cached guilds
+        task = asyncio.create_task(self.refresh(int(guild_id)))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def load(self) -> None:
+        """Load every guild config into memory, replacing anything already cached."""
+        rows = await self.db.rows("SELECT * FROM guild_config", record_cls=GuildConfig)
+        now = time.monotonic()
+        self._configs = {int(config.guild_id): config for config in rows}
+        self._fetched_at = dict.fromkeys(self._configs, now)
+        self.loaded_at = now
+
+        if self.prefixes is not None:
+            self.prefixes.clear()
+            for guild_id, config in self._configs.items():
+                self.prefixes.set_guild(guild_id, (config.prefix,))
+
+    def store(self, config: GuildConfig) -> None:
+        """Put a config that was just read from the database into the cache."""
+        guild_id = int(config.guild_id)
+        self._configs[guild_id] = config
+        self._fetched_at[guild_id] = time.monotonic()
+        if self.prefixes is not None:
+            self.prefixes.set_guild(guild_id, (config.prefix,))
+
+    def evict(self, guild_id: GuildIdT) -> None:
+        """Remove a guild from the cache, the next read will go to the database."""
+        self._configs.pop(int(guild_id), None)
+        self._fetched_at.pop(int(guild_id), None)
+        if self.prefixes is not None:
+            self.prefixes.remove_guild(guild_id)
+
+    def get_cached(self, guild_id: GuildIdT) -> GuildConfig | None:
+        """Get a guild's config without ever touching the database."""
+        return self._configs.get(int(guild_id))
+
+    async def get(self, guild_id: GuildIdT) -> GuildConfig:
+        """Get a guild's config, it will create one if it does not exist."""
+        if (config := self._configs.get(int(guild_id))) is not None:
+            self.hits += 1
+            return config
+
+        self.misses += 1
+        config = await self.db.row(
+            "INSERT INTO guild_config (guild_id) VALUES ($1) "
+            "ON CONFLICT (guild_id) DO UPDATE SET guild_id = EXCLUDED.guild_id RETURNING *",
+            guild_id,
+            record_cls=GuildConfig,
+        )
+        assert config is not None, "Database error creating guild config"
+        self.store(config)
+        return config
+
+    async def refresh(self, guild_id: GuildIdT) -> GuildConfig | None:
+        """Re-read a single guild's config from the database."""
+        config = await self.db.row("SELECT * FROM guild_config WHERE guild_id = $1", guild_id, record_cls=GuildConfig)
+        if config is None:
+            self.evict(guild_id)
+        else:
+            self.store(config)
+        return config
+
+    async def update(self, guild_id: GuildIdT, **values: t.Any) -> GuildConfig:
+        """Change columns of a guild's config in the database and in the cache.
+
+        Other processes are notified of the change and refresh their copy of the config.
+
+        ```python
+        await configs.update(ctx.guild_id, log_channel_id=channel.id)
+        ```
+        """
+        if not values:
+            raise ValueError("No values to update.")
+        if unknown := values.keys() - self.COLUMNS:
+            raise ValueError(f"Unknown guild config columns: {', '.join(sorted(unknown))}")
+
+        columns = ", ".join(values)
+        placeholders = ", ".join(f"${i}" for i in range(2, len(values) + 2))
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in values)
+        async with self.db.session(transaction=True) as session:
+            config = await session.row(
+                f"INSERT INTO guild_config (guild_id, {columns}) VALUES ($1, {placeholders}) "  # noqa: S608
+                f"ON CONFLICT (guild_id) DO UPDATE SET {assignments} RETURNING *",
+                guild_id,
+                *values.values(),
+                record_cls=GuildConfig,
+            )
+            # Only delivered once the transaction commits
+            await session.execute("SELECT pg_notify($1, $2)", self.CHANNEL, f"{self.node_id}:{int(guild_id)}")
+        assert config is not None, "Database error updating guild config"
+        self.writes += 1
+        self.store(config)
+        return config
+
+    def staleness(self) -> tuple[float, float]:
+        """Seconds since the cached configs were read from the database as `(mean, max)`."""
+        if not self._fetched_at:
+            return (0.0, 0.0)
+        now = time.monotonic()
+        ages = [now - fetched_at for fetched_at in self._fetched_at.values()]
+        return (sum(ages) / len(ages), max(ages))
+
+    def metrics(self) -> dict[str, float]:
+        """Cache metrics for the stats command."""
+        mean_age, max_age = self.staleness()
+        return {
+            "size": len(self._configs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            "mean_age": mean_age,
+            "max_age": max_age,
+        }
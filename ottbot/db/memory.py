@@ -0,0 +1,423 @@
+# -*- coding=utf-8 -*-
+"""An in-process stand-in for the postgres database, backed by SQLite.
+
+Selected with `DB_BACKEND=memory`. Queries keep their postgres syntax and are translated
+for SQLite, which covers the SQL used by the migrations and the modules:
+
+* `$1` placeholders become `?1`
+* `::type` casts are dropped
+* `bigserial` columns become `INTEGER` row ids and `now()` becomes `CURRENT_TIMESTAMP`
+* `pg_notify` is delivered to `MemoryDatabase.listen` in the same process
+
+Dates and times are stored as ISO 8601 text and read back as `datetime` objects from every column
+that the schema declares as `timestamp` or `date`, going by the column's name.
+Every statement waits `DatabaseConfig.memory_latency` seconds before it runs, to stand in for the network round trip.
+"""
+import asyncio
+import contextlib
+import datetime
+import functools
+import re
+import sqlite3
+import typing as t
+
+import aiofiles
+import asyncpg
+from asyncpg.pool import PoolConnectionProxy
+
+from ottbot import config as config_
+
+from . import migrations
+from .db import AsyncPGDatabase, Rec
+
+__all__ = ("MemoryDatabase", "MemoryRecord", "translate")
+
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+_CAST = re.compile(r"::\w+(?:\[\])?")
+_BIGSERIAL = re.compile(r"\bbigserial\b", re.IGNORECASE)
+_NOW = re.compile(r"\bnow\(\)", re.IGNORECASE)
+
+# Not `sqlite3.register_adapter`/`register_converter`, those apply to every sqlite3 connection in the process
+_COLUMN_TYPES: t.Final[dict[str, t.Callable[[str], t.Any]]] = {
+    "timestamp": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+}
+
+
+def _adapt(value: t.Any) -> t.Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(q: str) -> str:
+    """Translate a postgres query to SQLite."""
+    q = _PLACEHOLDER.sub(r"?\1", q)
+    q = _CAST.sub("", q)
+    q = _BIGSERIAL.sub("INTEGER", q)
+    return _NOW.sub("CURRENT_TIMESTAMP", q)
+
+
+class MemoryRecord:
+    """A row returned by `MemoryDatabase`, behaves like an `asyncpg.Record`.
+
+    Columns are accessible by index, by name and through '.' notation.
+    """
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, keys: dict[str, int], values: tuple[t.Any, ...]) -> None:
+        self._keys: dict[str, int] = keys
+        self._values: tuple[t.Any, ...] = values
+
+    def __getitem__(self, key: int | str | slice) -> t.Any:
+        if isinstance(key, str):
+            return self._values[self._keys[key]]
+        return self._values[key]
+
+    def __getattr__(self, __name: str, /) -> t.Any:
+        try:
+            return self._values[self._keys[__name]]
+        except KeyError as e:
+            raise AttributeError(*e.args) from e
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> t.Iterator[t.Any]:
+        return iter(self._values)
+
+    def __contains__(self, value: t.Any) -> bool:
+        return value in self._values
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MemoryRecord):
+            return self._values == other._values
+        return self._values == other
+
+    def __hash__(self) -> int:
+        return hash(self._values)
+
+    def __repr__(self) -> str:
+        return f"<Record {' '.join(f'{key}={value!r}' for key, value in self.items())}>"
+
+    def get(self, name: str, default: t.Any | None = None) -> t.Any | None:
+        return self._values[self._keys[name]] if name in self._keys else default
+
+    def keys(self) -> t.Iterator[str]:
+        return iter(self._keys)
+
+    def values(self) -> t.Iterator[t.Any]:
+        return iter(self._values)
+
+    def items(self) -> t.Iterator[tuple[str, t.Any]]:
+        return zip(self._keys, self._values)
+
+
+@functools.lru_cache(maxsize=None)
+def _record_type(record_cls: t.Type[asyncpg.Record] | None) -> t.Type[MemoryRecord]:
+    """A `MemoryRecord` with the properties and methods of an `asyncpg.Record` subclass.
+
+    Records can only be created by asyncpg itself, so subclasses like `GuildConfig` are copied onto `MemoryRecord`.
+    """
+    if record_cls is None or record_cls is asyncpg.Record:
+        return MemoryRecord
+    if not issubclass(record_cls, asyncpg.Record):
+        raise TypeError(f"record_cls must be a subclass of asyncpg.Record, not {record_cls!r}")
+
+    namespace: dict[str, t.Any] = {}
+    for base in reversed(record_cls.__mro__[: record_cls.__mro__.index(asyncpg.Record)]):
+        namespace.update(vars(base))
+    for name in ("__dict__", "__weakref__", "__init_subclass__"):
+        namespace.pop(name, None)
+    namespace["__slots__"] = ()
+    return type(record_cls.__name__, (MemoryRecord,), namespace)
+
+
+class _Engine:
+    """The SQLite database shared by every connection of a `_MemoryPool`."""
+
+    __slots__ = ("sqlite", "latency", "transaction_lock", "transaction_owner", "converters")
+
+    def __init__(self, latency: float) -> None:
+        self.sqlite: sqlite3.Connection = sqlite3.connect(":memory:", isolation_level=None)
+        self.latency: float = latency
+        self.transaction_lock: asyncio.Lock = asyncio.Lock()
+        self.transaction_owner: _MemoryConnection | None = None
+        self.converters: dict[str, t.Callable[[str], t.Any]] = {}
+        """Parsers of the text stored in date and time columns, by column name."""
+
+    def load_schema(self) -> None:
+        """Find the date and time columns, call after changing the schema."""
+        tables = [row[0] for row in self.sqlite.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        self.converters = {
+            column[1]: converter
+            for table in tables
+            for column in self.sqlite.execute(f"PRAGMA table_info({table})")
+            if (converter := _COLUMN_TYPES.get(column[2].split(" ", 1)[0].lower())) is not None
+        }
+
+    def _row_factory(
+        self, cursor: sqlite3.Cursor, record_cls: t.Type[MemoryRecord]
+    ) -> t.Callable[[tuple[t.Any, ...]], MemoryRecord]:
+        keys = {column[0]: index for index, column in enumerate(cursor.description or ())}
+        converters = [(index, c) for name, index in keys.items() if (c := self.converters.get(name)) is not None]
+        if not converters:
+            return lambda row: record_cls(keys, row)
+
+        def convert(row: tuple[t.Any, ...]) -> MemoryRecord:
+            values = list(row)
+            for index, converter in converters:
+                if isinstance(values[index], str):
+                    values[index] = converter(values[index])
+            return record_cls(keys, tuple(values))
+
+        return convert
+
+    async def run(
+        self,
+        conn: "_MemoryConnection",
+        q: str,
+        args: t.Sequence[t.Any],
+        *,
+        many: bool = False,
+        record_cls: t.Type[MemoryRecord] = MemoryRecord,
+    ) -> list[MemoryRecord]:
+        """Run a translated query once every other connection's transaction finished."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        while self.transaction_owner is not None and self.transaction_owner is not conn:
+            async with self.transaction_lock:
+                pass
+
+        if many:
+            cursor = self.sqlite.executemany(q, [[_adapt(value) for value in row] for row in args])
+        else:
+            cursor = self.sqlite.execute(q, [_adapt(value) for value in args])
+        if cursor.description is None:
+            return []
+        return list(map(self._row_factory(cursor, record_cls), cursor.fetchall()))
+
+    async def iterate(
+        self,
+        conn: "_MemoryConnection",
+        q: str,
+        args: t.Sequence[t.Any],
+        prefetch: int,
+        record_cls: t.Type[MemoryRecord] = MemoryRecord,
+    ) -> t.AsyncIterator[MemoryRecord]:
+        """Run a translated query and read its rows `prefetch` at a time."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        while self.transaction_owner is not None and self.transaction_owner is not conn:
+            async with self.transaction_lock:
+                pass
+
+        cursor = self.sqlite.execute(q, [_adapt(value) for value in args])
+        record = self._row_factory(cursor, record_cls)
+        while rows := cursor.fetchmany(prefetch):
+            for row in rows:
+                yield record(row)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+
+class _MemoryConnection:
+    """Mirrors the `asyncpg.pool.PoolConnectionProxy` methods used by `AsyncPGDatabase`.
+
+    Transactions lock the whole database and can't be nested.
+    """
+
+    __slots__ = ("engine", "_in_transaction", "__weakref__")
+
+    def __init__(self, engine: _Engine) -> None:
+        self.engine: _Engine = engine
+        self._in_transaction: bool = False
+
+    async def fetch(
+        self, q: str, *args: t.Any, record_class: t.Type[asyncpg.Record] | None = None
+    ) -> list[MemoryRecord]:
+        return await self.engine.run(self, translate(q), args, record_cls=_record_type(record_class))
+
+    async def fetchrow(
+        self, q: str, *args: t.Any, record_class: t.Type[asyncpg.Record] | None = None
+    ) -> MemoryRecord | None:
+        rows = await self.engine.run(self, translate(q), args, record_cls=_record_type(record_class))
+        return rows[0] if rows else None
+
+    async def fetchval(self, q: str, *args: t.Any) -> t.Any:
+        rows = await self.engine.run(self, translate(q), args)
+        return rows[0][0] if rows else None
+
+    async def execute(self, q: str, *args: t.Any) -> None:
+        await self.engine.run(self, translate(q), args)
+
+    async def executemany(self, q: str, args: t.Iterable[t.Sequence[t.Any]]) -> None:
+        await self.engine.run(self, translate(q), list(args), many=True)
+
+    def cursor(
+        self,
+        q: str,
+        *args: t.Any,
+        prefetch: int | None = None,
+        record_class: t.Type[asyncpg.Record] | None = None,
+    ) -> t.AsyncIterator[MemoryRecord]:
+        return self.engine.iterate(self, translate(q), args, prefetch or 50, _record_type(record_class))
+
+    def is_in_transaction(self) -> bool:
+        return self._in_transaction
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> t.AsyncIterator[None]:
+        async with self.engine.transaction_lock:
+            self.engine.transaction_owner = self
+            self._in_transaction = True
+            self.engine.sqlite.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                self.engine.sqlite.execute("ROLLBACK")
+                raise
+            else:
+                self.engine.sqlite.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+                self.engine.transaction_owner = None
+
+
+class _MemoryPool:
+    """Mirrors the `asyncpg.Pool` methods used by `AsyncPGDatabase`."""
+
+    __slots__ = ("engine", "_size", "_idle")
+
+    def __init__(self, engine: _Engine, size: int) -> None:
+        self.engine: _Engine = engine
+        self._size: int = size
+        self._idle: asyncio.Queue[_MemoryConnection] = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(_MemoryConnection(engine))
+
+    async def acquire(self, *, timeout: float | None = None) -> _MemoryConnection:
+        return await asyncio.wait_for(self._idle.get(), timeout)
+
+    async def release(self, conn: _MemoryConnection) -> None:
+        self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        self.engine.sqlite.close()
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_idle_size(self) -> int:
+        return self._idle.qsize()
+
+    def get_min_size(self) -> int:
+        return self._size
+
+    def get_max_size(self) -> int:
+        return self._size
+
+
+class MemoryDatabase(AsyncPGDatabase):
+    """An `AsyncPGDatabase` that keeps everything in an in-memory SQLite database.
+
+    Sessions and query statistics work exactly like they do with postgres, only the pool
+    underneath is replaced. There is no statement cache, so no cache hits or misses are counted.
+    The data is lost when the database is closed.
+    """
+
+    __slots__ = ("_listeners",)
+
+    def __init__(self, config: config_.DatabaseConfig) -> None:
+        """Create a new in-memory database."""
+        super().__init__(config)
+        self._listeners: dict[str, list[t.Callable[[str], None]]] = {}
+
+    async def connect(self) -> None:
+        """Create the database and apply every migration."""
+        engine = _Engine(self.config.memory_latency)
+        engine.sqlite.create_function("pg_notify", 2, self._notify)
+        self.pool = t.cast(asyncpg.Pool, _MemoryPool(engine, self.config.max_pool_size))
+        await self.migrate()
+
+    def _notify(self, channel: str, payload: str) -> None:
+        for callback in self._listeners.get(channel, ()):
+            callback(payload)
+
+    async def listen(
+        self,
+        channel: str,
+        callback: t.Callable[[str], None],
+        *,
+        on_reconnect: t.Callable[[], t.Awaitable[None]] | None = None,
+    ) -> None:
+        """Call `callback` with the payload of every `pg_notify` on `channel`, until cancelled.
+
+        There is only this process, so notifications are delivered straight away and never lost.
+        """
+        self._listeners.setdefault(channel, []).append(callback)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._listeners[channel].remove(callback)
+
+    def _count_statement(self, conn: PoolConnectionProxy, q: str, record_cls: t.Type[asyncpg.Record] | None) -> None:
+        """There is no statement cache to count hits of."""
+
+    def _engine(self) -> _Engine:
+        if self.pool is None:
+            raise ValueError("Not connected to database.")
+        return t.cast(_MemoryPool, self.pool).engine
+
+    @AsyncPGDatabase.with_connection
+    async def upsert_many(
+        self,
+        conn: PoolConnectionProxy,
+        table: str,
+        columns: t.Mapping[str, str],
+        values: t.Iterable[t.Sequence[t.Any]],
+        *,
+        conflict: t.Sequence[str] = (),
+        update: t.Sequence[str] = (),
+        record_cls: t.Type[Rec] | None = None,
+    ) -> t.List[Rec]:
+        """Insert many rows, returning the rows that were written.
+
+        SQLite has no `unnest`, so this inserts the rows one at a time.
+        """
+        names = ", ".join(columns)
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        q = f"INSERT INTO {table} ({names}) VALUES ({placeholders}) ON CONFLICT"  # noqa: S608
+        if conflict:
+            q += f" ({', '.join(conflict)})"
+        if update:
+            q += f" DO UPDATE SET {', '.join(f'{column} = EXCLUDED.{column}' for column in update)}"
+        else:
+            q += " DO NOTHING"
+        q += " RETURNING *"
+
+        written: t.List[Rec] = []
+        for row in values:
+            record = await self._run(conn, q, record_cls, lambda: conn.fetchrow(q, *row, record_class=record_cls))
+            if record is not None:
+                written.append(record)
+        return written
+
+    async def migrate(self) -> None:
+        """Apply every migration, the database always starts out empty."""
+        engine = self._engine()
+        for migration in migrations.find_migrations(self.migrations):
+            async with aiofiles.open(migration.path, "r", encoding="utf-8") as script:
+                engine.sqlite.executescript(translate(await script.read()))
+        engine.load_schema()
+
+    async def scriptexec(self, path: str) -> None:
+        """Execute an sql script at a given path."""
+        engine = self._engine()
+        async with aiofiles.open(path, "r", encoding="utf-8") as script:
+            engine.sqlite.executescript(translate(await script.read()))
+        engine.load_schema()
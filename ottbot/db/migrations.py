@@ -0,0 +1,93 @@
+# -*- coding=utf-8 -*-
+"""Versioned schema migrations.
+
+Migrations are `.sql` files named `<version>_<name>.sql`, e.g. `0002_indexes.sql`.
+Applied versions are recorded in the `schema_version` table and each migration runs in its own transaction.
+"""
+import dataclasses
+import pathlib
+import re
+import typing as t
+
+import aiofiles
+from asyncpg.pool import PoolConnectionProxy
+
+__all__ = ("Migration", "find_migrations", "current_version", "migrate")
+
+MIGRATION_LOCK_ID: t.Final[int] = 7_500_500_001
+"""Key of the advisory lock held while migrating, so only one bot process migrates at a time."""
+
+_FILE_NAME = re.compile(r"^(?P<version>\d+)_(?P<name>\w+)\.sql$")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Migration:
+    """A single migration file."""
+
+    version: int
+    name: str
+    path: pathlib.Path
+
+
+def find_migrations(directory: str | pathlib.Path) -> list[Migration]:
+    """Get every migration in a directory, sorted by version."""
+    migrations: dict[int, Migration] = {}
+    for path in pathlib.Path(directory).iterdir():
+        if (match := _FILE_NAME.match(path.name)) is None:
+            continue
+
+        version = int(match["version"])
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {migrations[version].path} and {path}")
+        migrations[version] = Migration(version, match["name"], path)
+
+    return [migrations[version] for version in sorted(migrations)]
+
+
+async def current_version(conn: PoolConnectionProxy) -> int:
+    """Get the latest applied migration version, 0 if nothing has been applied yet."""
+    if await conn.fetchval("SELECT to_regclass('schema_version')") is None:
+        return 0
+    return await conn.fetchval("SELECT coalesce(max(version), 0) FROM schema_version")
+
+
+async def migrate(conn: PoolConnectionProxy, directory: str | pathlib.Path) -> list[Migration]:
+    """Apply every migration newer than the current schema version.
+
+    Returns the migrations that were applied. When the schema is already current this
+    only reads `schema_version`, without taking any locks.
+    """
+    if not (migrations := find_migrations(directory)):
+        return []
+    if await current_version(conn) >= migrations[-1].version:
+        return []
+
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute(
+            """CREATE TABLE IF NOT EXISTS schema_version (
+                version integer NOT NULL PRIMARY KEY,
+                name varchar(64) NOT NULL,
+                applied_at timestamp with time zone NOT NULL DEFAULT now()
+            )"""
+        )
+        # Another process might have migrated while we were waiting for the lock
+        version = await current_version(conn)
+
+        applied: list[Migration] = []
+        for migration in migrations:
+            if migration.version <= version:
+                continue
+
+            async with aiofiles.open(migration.path, "r", encoding="utf-8") as script:
+                sql = await script.read()
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, name) VALUES ($1, $2)", migration.version, migration.name
+                )
+            applied.append(migration)
+
+        return applied
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
@@ -1,6 +1,7 @@
 # -*- coding=utf-8 -*-
 """Database models."""
 import datetime
+import operator
 import typing as t
 
 import asyncpg
@@ -8,15 +9,42 @@ import asyncpg
 __all__ = ("AutoRole", "Currency", "GuildConfig", "User", "Starboard")
 
 
+def _column(name: str) -> property:
+    """A property reading a column by name."""
+    getter = operator.itemgetter(name)
+
+    def get(record: asyncpg.Record) -> t.Any:
+        try:
+            return getter(record)
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+    return property(get)
+
+
 class AttrRecord(asyncpg.Record):
     """An `asyncpg.Record` where attributes are accessible through '.' notation.
 
     print(Record.id)
     print(Record.name)
+
+    Every annotated column of a subclass gets a property that reads it with `operator.itemgetter`,
+    one Python call instead of a failed attribute lookup and the exception handling of `__getattr__`.
+    Columns that aren't declared, e.g. computed ones, still resolve through `__getattr__`. A declared
+    column that the query didn't select raises `AttributeError`, so `getattr` defaults and `hasattr` work.
     """
 
     __tablename__: str
 
+    def __init_subclass__(cls, **kwargs: t.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in cls.__dict__.get("__annotations__", {}):
+            if name.startswith("__"):
+                continue
+            if hasattr(asyncpg.Record, name):
+                raise TypeError(f"Column {name!r} of {cls.__name__} would shadow asyncpg.Record.{name}")
+            setattr(cls, name, _column(name))
+
     def __getattr__(self, __name: str, /) -> t.Any:
         try:
             return self[__name]
@@ -56,7 +84,7 @@ class GuildConfig(AttrRecord):
     guild_id: int
     prefix: str
     welcome_channel_id: int | None
-    welcome_mesage: str | None
+    welcome_message: str | None
     log_channel_id: int | None
     starboard_channel_id: int | None
 
@@ -84,3 +112,7 @@ class Starboard(AttrRecord):
     original_message_id: int
     sent_channel_id: int
     sent_message_id: int
+    guild_id: int | None
+    author_id: int | None
+    star_count: int
+    created_at: datetime.datetime | None
@@ -0,0 +1,292 @@
+# -*- coding=utf-8 -*-
+"""Cached lookups of starboard posts and leaderboards backed by the `starboard` tables."""
+import collections
+import contextlib
+import datetime
+import logging
+import typing as t
+
+import hikari
+
+from ottbot.utils.bloom import BloomFilter
+
+from .db import AsyncPGDatabase, DatabaseSession
+
+__all__ = ("StarboardPost", "StarboardService", "StarredAuthor", "StarredMessage")
+
+logger = logging.getLogger(__name__)
+
+_NOT_STARRED: t.Final[None] = None
+
+
+def _start_of_day(since: datetime.datetime) -> datetime.datetime:
+    """Midnight UTC of the day `since` falls on, the per-author aggregates only know whole days."""
+    return since.astimezone(datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class StarboardPost(t.NamedTuple):
+    """The starboard post of a message."""
+
+    original_channel_id: int
+    original_message_id: int
+    sent_channel_id: int
+    sent_message_id: int
+
+
+class StarredMessage(t.NamedTuple):
+    """A message on the leaderboard."""
+
+    original_channel_id: int
+    original_message_id: int
+    author_id: int
+    star_count: int
+
+
+class StarredAuthor(t.NamedTuple):
+    """An author on the leaderboard."""
+
+    author_id: int
+    stars: int
+    messages: int
+
+
+class StarboardService:
+    """Finds the starboard post of a message without querying the database for unstarred messages.
+
+    Every starred message id is kept in a Bloom filter, loaded at startup, so reactions on
+    messages that were never starred (nearly all of them) are rejected from memory. Posts
+    and confirmed misses are kept in an LRU cache of `max_entries`, preloaded with the
+    `preload` newest posts.
+
+    Every post stores its guild, author, creation time and star count, and each change of
+    the count is added to the `starboard_daily` and `starboard_totals` aggregates in the
+    same transaction, so leaderboards read a few index pages instead of scanning every post.
+
+    Messages are only ever starred by the process running their guild's shard, so the
+    filter doesn't need to hear about posts created by other processes.
+    """
+
+    __slots__ = (
+        "db",
+        "max_entries",
+        "preload",
+        "error_rate",
+        "hits",
+        "misses",
+        "rejected",
+        "_filter",
+        "_posts",
+    )
+
+    COLUMNS: t.Final[str] = "original_channel_id, original_message_id, sent_channel_id, sent_message_id"
+
+    TOP_MESSAGES: t.Final[str] = (
+        "SELECT original_channel_id, original_message_id, author_id, star_count FROM starboard "
+        "WHERE guild_id = $1 AND star_count > 0 ORDER BY star_count DESC LIMIT $2"
+    )
+    TOP_MESSAGES_SINCE: t.Final[str] = (
+        "SELECT original_channel_id, original_message_id, author_id, star_count FROM starboard "
+        "WHERE guild_id = $1 AND created_at >= $2 AND star_count > 0 ORDER BY star_count DESC LIMIT $3"
+    )
+    TOP_AUTHORS: t.Final[str] = (
+        "SELECT author_id, stars, messages FROM starboard_totals "
+        "WHERE guild_id = $1 AND stars > 0 ORDER BY stars DESC LIMIT $2"
+    )
+    TOP_AUTHORS_SINCE: t.Final[str] = (
+        "SELECT author_id, sum(stars) AS stars, sum(messages) AS messages FROM starboard_daily "
+        "WHERE guild_id = $1 AND day >= $2 GROUP BY author_id HAVING sum(stars) > 0 ORDER BY stars DESC LIMIT $3"
+    )
+
+    def __init__(
+        self,
+        db: AsyncPGDatabase,
+        *,
+        max_entries: int = 10_000,
+        preload: int = 1_000,
+        error_rate: float = 0.01,
+    ) -> None:
+        """Create a new starboard service, `open` loads the filter."""
+        self.db: AsyncPGDatabase = db
+        self.max_entries: int = max_entries
+        self.preload: int = preload
+        self.error_rate: float = error_rate
+        self.hits: int = 0
+        self.misses: int = 0
+        self.rejected: int = 0
+        self._filter: BloomFilter | None = None
+        """None until loaded, every lookup goes to the cache and the database until then."""
+        self._posts: collections.OrderedDict[int, StarboardPost | None] = collections.OrderedDict()
+
+    async def open(self) -> None:
+        """Load every starred message id into the filter and the newest posts into the cache."""
+        total = await self.db.fetch("SELECT count(*) FROM starboard") or 0
+        # Room to double before the false positive rate degrades, it's rebuilt on every start
+        bloom = BloomFilter(max(2 * total, 10_000), self.error_rate)
+        async with contextlib.aclosing(self.db.stream("SELECT original_message_id FROM starboard")) as rows:
+            async for row in rows:
+                bloom.add(row["original_message_id"])
+
+        for row in reversed(
+            await self.db.rows(f"SELECT {self.COLUMNS} FROM starboard ORDER BY id DESC LIMIT $1", self.preload)
+        ):
+            self._cache(row["original_message_id"], StarboardPost(*row))
+        # Posts added while loading are in the cache already, they only miss from the new filter
+        for message_id, post in self._posts.items():
+            if post is not None:
+                bloom.add(message_id)
+        self._filter = bloom
+        logger.info(f"Loaded {len(bloom):,} starred messages")
+
+    def _cache(self, message_id: int, post: StarboardPost | None) -> None:
+        self._posts[message_id] = post
+        self._posts.move_to_end(message_id)
+        if len(self._posts) > self.max_entries:
+            self._posts.popitem(last=False)
+
+    def might_be_starred(self, message_id: hikari.Snowflakeish) -> bool:
+        """False if the message definitely has no starboard post."""
+        return self._filter is None or int(message_id) in self._filter
+
+    async def get(self, message_id: hikari.Snowflakeish) -> StarboardPost | None:
+        """Get the starboard post of a message."""
+        message_id = int(message_id)
+        if message_id in self._posts:
+            self.hits += 1
+            self._posts.move_to_end(message_id)
+            return self._posts[message_id]
+        if not self.might_be_starred(message_id):
+            self.rejected += 1
+            return _NOT_STARRED
+
+        self.misses += 1
+        row = await self.db.row(f"SELECT {self.COLUMNS} FROM starboard WHERE original_message_id = $1", message_id)
+        post = StarboardPost(*row) if row is not None else _NOT_STARRED
+        self._cache(message_id, post)
+        return post
+
+    async def save(
+        self,
+        post: StarboardPost,
+        *,
+        guild_id: hikari.Snowflakeish,
+        author_id: hikari.Snowflakeish,
+        created_at: datetime.datetime,
+        stars: int,
+    ) -> None:
+        """Store a starboard post with the current star count of its message."""
+        self._cache(post.original_message_id, post)
+        if self._filter is not None:
+            self._filter.add(post.original_message_id)
+
+        async with self.db.session(transaction=True) as session:
+            # Posts are only saved under the tracker's lock of their message, so the count can't change in between
+            old = await session.row(
+                "SELECT guild_id, star_count FROM starboard WHERE original_message_id = $1", post.original_message_id
+            )
+            if old is None:
+                await session.execute(
+                    f"INSERT INTO starboard ({self.COLUMNS}, guild_id, author_id, created_at, star_count) "
+                    "VALUES ($1, $2, $3, $4, $5, $6, $7, $8)",
+                    *post,
+                    int(guild_id),
+                    int(author_id),
+                    created_at,
+                    stars,
+                )
+            else:
+                await session.execute(
+                    "UPDATE starboard SET guild_id = $2, author_id = $3, created_at = $4, star_count = $5 "
+                    "WHERE original_message_id = $1",
+                    post.original_message_id,
+                    int(guild_id),
+                    int(author_id),
+                    created_at,
+                    stars,
+                )
+
+            # Posts from before the leaderboard have no guild and were never counted
+            if old is not None and old["guild_id"] is not None:
+                await self._count(session, guild_id, author_id, created_at, stars - old["star_count"], 0)
+            else:
+                await self._count(session, guild_id, author_id, created_at, stars, 1)
+
+    async def remove(self, message_id: hikari.Snowflakeish) -> None:
+        """Forget the starboard post of a message."""
+        self._cache(int(message_id), _NOT_STARRED)
+        async with self.db.session(transaction=True) as session:
+            old = await session.row(
+                "DELETE FROM starboard WHERE original_message_id = $1 "
+                "RETURNING guild_id, author_id, created_at, star_count",
+                int(message_id),
+            )
+            if old is not None and old["guild_id"] is not None:
+                await self._count(
+                    session, old["guild_id"], old["author_id"], old["created_at"], -old["star_count"], -1
+                )
+
+    @staticmethod
+    async def _count(
+        session: DatabaseSession,
+        guild_id: hikari.Snowflakeish,
+        author_id: hikari.Snowflakeish,
+        created_at: datetime.datetime,
+        stars: int,
+        messages: int,
+    ) -> None:
+        """Add to the aggregates of an author, on the day the starred message was sent."""
+        if not stars and not messages:
+            return
+        day = created_at.astimezone(datetime.timezone.utc).date()
+        await session.execute(
+            "INSERT INTO starboard_daily (guild_id, day, author_id, stars, messages) VALUES ($1, $2, $3, $4, $5) "
+            "ON CONFLICT (guild_id, day, author_id) DO UPDATE SET "
+            "stars = starboard_daily.stars + EXCLUDED.stars, messages = starboard_daily.messages + EXCLUDED.messages",
+            int(guild_id),
+            day,
+            int(author_id),
+            stars,
+            messages,
+        )
+        await session.execute(
+            "INSERT INTO starboard_totals (guild_id, author_id, stars, messages) VALUES ($1, $2, $3, $4) "
+            "ON CONFLICT (guild_id, author_id) DO UPDATE SET "
+            "stars = starboard_totals.stars + EXCLUDED.stars, messages = starboard_totals.messages + EXCLUDED.messages",
+            int(guild_id),
+            int(author_id),
+            stars,
+            messages,
+        )
+
+    async def top_messages(
+        self, guild_id: hikari.Snowflakeish, *, since: datetime.datetime | None = None, limit: int = 100
+    ) -> list[StarredMessage]:
+        """The most starred messages of a guild, optionally only those sent from the UTC day of `since`.
+
+        `since` is rounded down to midnight UTC so the window matches `top_authors`.
+        """
+        if since is None:
+            rows = await self.db.rows(self.TOP_MESSAGES, int(guild_id), limit)
+        else:
+            rows = await self.db.rows(self.TOP_MESSAGES_SINCE, int(guild_id), _start_of_day(since), limit)
+        return [StarredMessage(*row) for row in rows]
+
+    async def top_authors(
+        self, guild_id: hikari.Snowflakeish, *, since: datetime.datetime | None = None, limit: int = 100
+    ) -> list[StarredAuthor]:
+        """The authors with the most stars in a guild, optionally only on messages sent from the UTC day of `since`."""
+        if since is None:
+            rows = await self.db.rows(self.TOP_AUTHORS, int(guild_id), limit)
+        else:
+            rows = await self.db.rows(self.TOP_AUTHORS_SINCE, int(guild_id), _start_of_day(since).date(), limit)
+        return [StarredAuthor(*row) for row in rows]
+
+    def metrics(self) -> dict[str, t.Any]:
+        """Cache and filter metrics for the stats command."""
+        return {
+            "cached": len(self._posts),
+            "starred": len(self._filter) if self._filter is not None else None,
+            "false_positive_rate": self._filter.false_positive_rate if self._filter is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,95 @@
+# -*- coding=utf-8 -*-
+"""Per-statement query statistics."""
+import functools
+import re
+import time
+import typing as t
+
+from ottbot.utils.metrics import LatencyHistogram
+
+__all__ = ("StatementStats", "QueryStats", "fingerprint")
+
+_STRING = re.compile(r"'(?:''|[^'])*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(q: str) -> str:
+    """Normalise a query so statements that only differ in literals and whitespace are grouped together.
+
+    SELECT * FROM users WHERE id = 1  ->  SELECT * FROM users WHERE id = ?
+    """
+    q = _STRING.sub("?", q)
+    q = _NUMBER.sub("?", q)
+    return _WHITESPACE.sub(" ", q).strip()
+
+
+class StatementStats:
+    """Statistics about a single statement fingerprint."""
+
+    __slots__ = ("calls", "errors", "rows", "latency")
+
+    def __init__(self) -> None:
+        """Create empty statement statistics."""
+        self.calls: int = 0
+        self.errors: int = 0
+        self.rows: int = 0
+        self.latency: LatencyHistogram = LatencyHistogram()
+
+    def to_dict(self) -> dict[str, t.Any]:
+        return {"calls": self.calls, "errors": self.errors, "rows": self.rows, "latency": self.latency.summary()}
+
+
+class QueryStats:
+    """Query statistics of an `AsyncPGDatabase`, grouped by statement fingerprint."""
+
+    __slots__ = ("started_at", "acquire", "statements")
+
+    def __init__(self) -> None:
+        """Create empty query statistics."""
+        self.started_at: float = time.time()
+        self.acquire: LatencyHistogram = LatencyHistogram()
+        """Time spent waiting for a connection from the pool."""
+        self.statements: dict[str, StatementStats] = {}
+
+    def record(self, q: str, seconds: float, rows: int = 0, *, error: bool = False) -> None:
+        """Record a single execution of a query."""
+        if (stats := self.statements.get(key := fingerprint(q))) is None:
+            stats = self.statements[key] = StatementStats()
+
+        stats.calls += 1
+        stats.rows += rows
+        stats.errors += error
+        stats.latency.record(seconds)
+
+    def record_acquire(self, seconds: float) -> None:
+        """Record the time it took to acquire a pool connection."""
+        self.acquire.record(seconds)
+
+    def top(
+        self, n: int = 10, key: t.Literal["calls", "total", "p99", "rows", "errors"] = "total"
+    ) -> list[tuple[str, StatementStats]]:
+        """Get the `n` statements with the highest `key`."""
+        sort_keys: dict[str, t.Callable[[StatementStats], float]] = {
+            "calls": lambda s: s.calls,
+            "total": lambda s: s.latency.total,
+            "p99": lambda s: s.latency.percentile(99),
+            "rows": lambda s: s.rows,
+            "errors": lambda s: s.errors,
+        }
+        return sorted(self.statements.items(), key=lambda item: sort_keys[key](item[1]), reverse=True)[:n]
+
+    def reset(self) -> None:
+        """Forget every recorded statistic."""
+        self.started_at = time.time()
+        self.acquire = LatencyHistogram()
+        self.statements = {}
+
+    def dump(self) -> dict[str, t.Any]:
+        """Every statistic in a json serializable form."""
+        return {
+            "started_at": self.started_at,
+            "acquire": self.acquire.summary(),
+            "statements": {q: stats.to_dict() for q, stats in self.statements.items()},
+        }
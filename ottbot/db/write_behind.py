@@ -0,0 +1,173 @@
+# -*- coding=utf-8 -*-
+"""Write-behind batching for non-critical database writes."""
+import asyncio
+import logging
+import time
+import typing as t
+
+from ottbot.utils.metrics import LatencyHistogram
+
+from .db import AsyncPGDatabase
+
+__all__ = ("WriteBehindQueue",)
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Buffers writes and flushes them as `executemany` batches.
+
+    Writes with the same statement text are coalesced into one batch. Batches are flushed
+    every `flush_interval` seconds, or as soon as `max_batch` writes are pending.
+    Writes of the same statement keep their order unless one is retried, there is no ordering between
+    different statements. A batch that fails is written again one row at a time, rows that still fail
+    are queued again and retried once with the next flush, then dropped. Only use this for
+    fire-and-forget writes that nothing reads back straight away and nobody is told succeeded.
+
+    ```python
+    writes.enqueue("INSERT INTO events (guild_id, kind) VALUES ($1, $2)", guild_id, kind)
+    ```
+    """
+
+    __slots__ = (
+        "db",
+        "max_batch",
+        "flush_interval",
+        "flushed",
+        "failed",
+        "flush_latency",
+        "_pending",
+        "_size",
+        "_wakeup",
+        "_flush_lock",
+        "_retried",
+        "_closing",
+        "_task",
+    )
+
+    def __init__(self, db: AsyncPGDatabase, *, max_batch: int = 500, flush_interval: float = 1.0) -> None:
+        """Create a new write-behind queue."""
+        self.db: AsyncPGDatabase = db
+        self.max_batch: int = max_batch
+        self.flush_interval: float = flush_interval
+        self.flushed: int = 0
+        self.failed: int = 0
+        self.flush_latency: LatencyHistogram = LatencyHistogram()
+        self._pending: dict[str, list[t.Sequence[t.Any]]] = {}
+        self._size: int = 0
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+        self._retried: set[str] = set()
+        """Statements whose last batch failed and was queued again."""
+        self._closing: bool = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def depth(self) -> int:
+        """Number of writes waiting to be flushed."""
+        return self._size
+
+    def enqueue(self, q: str, *values: t.Any) -> None:
+        """Queue a write, it will be executed with the next batch."""
+        self._pending.setdefault(q, []).append(values)
+        self._size += 1
+        if self._size >= self.max_batch:
+            self._wakeup.set()
+
+    async def open(self) -> None:
+        """Start flushing in the background."""
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the background task and flush every pending write."""
+        # Cancelling the task could interrupt a flush, which already took its batches out of the queue
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+        await self.flush()
+        if self._retried:
+            await self.flush()
+
+    def _requeue(self, q: str, values: list[t.Sequence[t.Any]]) -> None:
+        """Put writes back in front of the writes of the same statement that were queued since."""
+        self._pending[q] = values + self._pending.get(q, [])
+        self._size += len(values)
+
+    async def _write(self, q: str, rows: list[t.Sequence[t.Any]]) -> list[t.Sequence[t.Any]]:
+        """Write a batch and return the rows that failed.
+
+        `executemany` is atomic, so one bad row rejects the whole batch and a failed batch is written
+        again one row at a time. When cancelled, `rows` is left with only the rows that weren't written.
+        """
+        try:
+            await self.db.executemany(q, rows)
+        except Exception:
+            logger.warning(f"Failed to flush {len(rows)} writes of {q!r}, writing them one at a time", exc_info=True)
+        else:
+            self.flushed += len(rows)
+            return []
+
+        failed: list[t.Sequence[t.Any]] = []
+        for index, row in enumerate(rows):
+            try:
+                await self.db.execute(q, *row)
+            except asyncio.CancelledError:
+                rows[:] = failed + rows[index:]
+                raise
+            except Exception:
+                failed.append(row)
+                logger.warning(f"Failed to write {row!r} with {q!r}", exc_info=True)
+            else:
+                self.flushed += 1
+        return failed
+
+    async def flush(self) -> None:
+        """Execute every pending write now."""
+        async with self._flush_lock:
+            pending, self._pending, self._size = self._pending, {}, 0
+            batches = list(pending.items())
+            for index, (q, values) in enumerate(batches):
+                started = time.perf_counter()
+                try:
+                    failed = await self._write(q, values)
+                except asyncio.CancelledError:
+                    for unwritten in batches[index:]:
+                        self._requeue(*unwritten)
+                    raise
+                finally:
+                    self.flush_latency.record(time.perf_counter() - started)
+
+                if not failed:
+                    self._retried.discard(q)
+                elif q in self._retried:
+                    self._retried.discard(q)
+                    self.failed += len(failed)
+                    logger.error(f"Dropped {len(failed)} writes of {q!r} after retrying them")
+                else:
+                    self._retried.add(q)
+                    self._requeue(q, failed)
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._size:
+                await self.flush()
+
+    def metrics(self) -> dict[str, t.Any]:
+        """Queue depth, totals and flush latency."""
+        return {
+            "depth": self._size,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "flush_latency": self.flush_latency.summary(),
+        }
@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
-"""Sync the database on shard ready and guild create events."""
+"""Sync the database when the bot starts and on guild create events."""
 
 import logging
 
 import hikari
 import tanjun
 
-from ottbot.db import AsyncPGDatabase
+from ottbot.db import AsyncPGDatabase, GuildConfig, GuildConfigService
 from ottbot.utils.funcs import build_loaders
 
 component, load_component, unload_component = build_loaders()
@@ -14,20 +14,30 @@ component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
 
 
-@component.with_listener(hikari.ShardReadyEvent)
-async def lsnr_shard_ready_sync_db(
-    event: hikari.ShardReadyEvent, db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase)
+@component.with_listener(hikari.StartedEvent)
+async def lsnr_started_sync_db(
+    event: hikari.StartedEvent,
+    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
 ) -> None:
-    """Shard ready event listener."""
+    """Create missing guild configs once every shard has started.
+
+    `fetch_my_guilds` returns every guild regardless of shard, so this only needs to run once per process.
+    """
     guilds = await event.app.rest.fetch_my_guilds()
 
-    for guild in guilds:
-        await db.execute("INSERT INTO guild_config (guild_id) VALUES ($1) ON CONFLICT DO NOTHING", guild.id)
+    created = await db.upsert_many(
+        "guild_config", {"guild_id": "bigint"}, [(guild.id,) for guild in guilds], record_cls=GuildConfig
+    )
+    for config in created:
+        configs.store(config)
+
+    logger.info(f"Synced {len(guilds)} guilds, {len(created)} new guild configs")
 
 
 @component.with_listener(hikari.GuildJoinEvent)
 async def lsnr_new_guild_sync_db(
-    event: hikari.GuildJoinEvent, db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase)
+    event: hikari.GuildJoinEvent, configs: GuildConfigService = tanjun.inject(type=GuildConfigService)
 ) -> None:
     """Add new guild to db when the bot joins."""
-    await db.execute("INSERT INTO guild_config (guild_id) VALUES ($1) ON CONFLICT DO NOTHING", event.guild.id)
+    await configs.get(event.guild.id)
@@ -7,10 +7,11 @@ import logging
 import hikari
 import sake
 import tanjun
-from hikari import audit_logs as hikari_audit_logs
 
 from ottbot.constants import ZWJ, Colors
-from ottbot.db import AsyncPGDatabase, GuildConfig
+from ottbot.db import GuildConfigService
+from ottbot.utils.audit_logs import AuditLogCache
+from ottbot.utils.dispatch import by_guild, ordered
 from ottbot.utils.embeds import ESCAPE_NAME as EMBED_ESCAPE_NAME
 from ottbot.utils.embeds import EmbedFactory, FieldsT
 from ottbot.utils.funcs import (
@@ -20,60 +21,62 @@ from ottbot.utils.funcs import (
     get_member,
     strfdelta,
 )
+from ottbot.utils.log_sink import LogSink
 
 component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
 
 
 @component.with_listener(hikari.BanCreateEvent)
+@ordered(by_guild)
 async def lsnr_ban_create(
     event: hikari.BanCreateEvent,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
+    audit_logs: AuditLogCache = tanjun.inject(type=AuditLogCache),
+    log_sink: LogSink = tanjun.inject(type=LogSink),
 ) -> None:
     """On member ban event listener."""
-    if not (
-        config := await db.row("SELECT * FROM guild_config WHERE guild_id = $1", event.guild_id, record_cls=GuildConfig)
-    ):
-        return
+    config = await configs.get(event.guild_id)
     if config.log_channel_id is None:
         return
 
     # Get information about event
     banned_at = datetime.datetime.now().astimezone()
-    ban = await event.fetch_ban()
-    ban_logs = await bot.rest.fetch_audit_log(
-        event.guild_id, user=ban.user, event_type=hikari_audit_logs.AuditLogEventType.MEMBER_BAN_ADD
-    )
+    ban_type = hikari.AuditLogEventType.MEMBER_BAN_ADD
+    entry = await audit_logs.find(event.guild_id, ban_type, target_id=event.user_id)
+    recent_bans = await audit_logs.entries(event.guild_id, ban_type)
+    banned_by = f"<@{entry.user_id}>" if entry is not None and entry.user_id is not None else "Unknown"
+    reason = f" for {entry.reason}" if entry is not None and entry.reason else ""
+    bans_by_moderator = sum(1 for e in recent_bans if entry is not None and e.user_id == entry.user_id)
+    previous_bans = sum(1 for e in recent_bans if e.target_id == event.user_id) - (entry is not None)
+
     header_text = full_name(event.user)
     header_icon = event.user.avatar_url
-    desc = f"{event.user.username} was banned by {ban.user.mention}{f' for {ban.reason}' if ban.reason else ''}"
+    desc = f"{event.user.username} was banned by {banned_by}{reason}"
 
     fields: FieldsT = [
         ("Banned At", format_time(banned_at, "f"), True),
-        ("Banned By", ban.user.mention, True),
-        ("# of Bans", len(ban_logs), True),
+        ("Banned By", banned_by, True),
+        ("# of Bans", bans_by_moderator, True),
     ]
     try:
         banned_user = await get_member(event.guild_id, event.user_id, bot.cache, redis, bot.rest)
-        previous_offenses = await bot.rest.fetch_audit_log(
-            event.guild_id, user=banned_user, event_type=hikari_audit_logs.AuditLogEventType.MEMBER_BAN_ADD
-        )
 
         fields: FieldsT = [
             ("Joined At", format_time(banned_user.joined_at, "f"), True),
             ("Banned At", format_time(banned_at, "f"), True),
             ("Time in Server", strfdelta(banned_at - banned_user.joined_at), True),
-            ("Previous Bans", len(previous_offenses), True),
+            ("Previous Bans", previous_bans, True),
             (ZWJ, ZWJ, False),
-            ("Banned By", ban.user.mention, True),
-            ("# of Bans", len(ban_logs), True),
+            ("Banned By", banned_by, True),
+            ("# of Bans", bans_by_moderator, True),
         ]
 
         header_text = full_name(banned_user)
         header_icon = banned_user.avatar_url
-        desc = f"{banned_user.username} was banned by {ban.user.mention}{f' for {ban.reason}' if ban.reason else ''}"
+        desc = f"{banned_user.username} was banned by {banned_by}{reason}"
     finally:
         embed = EmbedFactory.build(
             event,
@@ -83,9 +86,9 @@ async def lsnr_ban_create(
             color=Colors.INFO,
             title="User Ban",
             desc=desc,
-            author=ban.user,
+            author=event.user,
             footer="🔨",
             footer_icon=EMBED_ESCAPE_NAME,
             fields=fields,
         )
-        await bot.rest.create_message(config.log_channel_id, embed=embed)
+        log_sink.send(config.log_channel_id, embed)
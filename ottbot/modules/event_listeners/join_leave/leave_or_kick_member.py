@@ -10,7 +10,9 @@ import tanjun
 from hikari import audit_logs as hikari_audit_logs
 
 from ottbot.constants import Colors
-from ottbot.db import AsyncPGDatabase, GuildConfig
+from ottbot.db import GuildConfigService
+from ottbot.utils.audit_logs import AuditLogCache
+from ottbot.utils.dispatch import by_guild, ordered
 from ottbot.utils.embeds import ESCAPE_NAME as EMBED_ESCAPE_NAME
 from ottbot.utils.embeds import EmbedFactory, FieldsT
 from ottbot.utils.funcs import (
@@ -20,6 +22,7 @@ from ottbot.utils.funcs import (
     get_member,
     strfdelta,
 )
+from ottbot.utils.log_sink import LogSink
 
 component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
@@ -108,25 +111,24 @@ async def _build_kick_embed(
 
 
 @component.with_listener(hikari.MemberDeleteEvent)
+@ordered(by_guild)
 async def lsnr_member_delete(
     event: hikari.MemberDeleteEvent,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
+    audit_logs: AuditLogCache = tanjun.inject(type=AuditLogCache),
+    log_sink: LogSink = tanjun.inject(type=LogSink),
 ) -> None:
     """On member leave or kick event listener."""
     left_or_kicked_at = datetime.datetime.now().astimezone()
-    if not (
-        config := await db.row("SELECT * FROM guild_config WHERE guild_id = $1", event.guild_id, record_cls=GuildConfig)
-    ):
-        return
+    config = await configs.get(event.guild_id)
 
-    audit_log = await bot.rest.fetch_audit_log(
-        event.guild_id, event_type=hikari_audit_logs.AuditLogEventType.MEMBER_KICK, user=event.user_id
-    ).last()
-    last_kick = sorted(audit_log.entries.values(), key=lambda x: x.created_at, reverse=True)[0]
+    last_kick = await audit_logs.find(
+        event.guild_id, hikari_audit_logs.AuditLogEventType.MEMBER_KICK, target_id=event.user_id
+    )
 
-    if last_kick.target_id == event.user_id:
+    if last_kick is not None:
         # User was kicked
         if (channel_id := config.log_channel_id) is None:
             return
@@ -138,4 +140,4 @@ async def lsnr_member_delete(
             return
         embed = await _build_leave_embed(bot, event, redis, left_or_kicked_at)
 
-    await bot.rest.create_message(channel_id, embed=embed)
+    log_sink.send(channel_id, embed)
@@ -7,7 +7,8 @@ import hikari
 import sake
 import tanjun
 
-from ottbot.db import AsyncPGDatabase, GuildConfig
+from ottbot.db import GuildConfigService
+from ottbot.utils.dispatch import by_guild, ordered
 from ottbot.utils.funcs import build_loaders
 
 component, load_component, unload_component = build_loaders()
@@ -21,19 +22,15 @@ def _prepare_welcome_message(msg: str, event: hikari.MemberCreateEvent) -> str:
 
 
 @component.with_listener(hikari.MemberCreateEvent)
+@ordered(by_guild)
 async def lsnr_guild_member_create(
     event: hikari.MemberCreateEvent,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
 ) -> None:
     """On member join event listener."""
-    if (
-        guild_config := await db.row(
-            "SELECT * FROM guild_config WHERE guild_id = $1", event.guild_id, record_cls=GuildConfig
-        )
-    ) is None:
-        return
+    guild_config = await configs.get(event.guild_id)
     if guild_config.welcome_channel_id is None or guild_config.welcome_message is None:
         return
 
@@ -2,32 +2,49 @@
 """Member update event listener."""
 
 import logging
+import typing as t
 
 import hikari
 import sake
 import tanjun
 
-from ottbot.db import AsyncPGDatabase, GuildConfig
+from ottbot.db import AsyncPGDatabase, GuildConfigService
+from ottbot.utils.dispatch import by_guild, ordered
 from ottbot.utils.embeds import EmbedFactory, FieldsT
 from ottbot.utils.funcs import build_loaders
+from ottbot.utils.log_sink import LogSink
+from ottbot.utils.members import has_logged_changes, role_changes
 
 component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
 
 
+def _mention_roles(role_ids: t.Iterable[hikari.Snowflake], cache: hikari.api.Cache) -> str:
+    """Mention roles highest first, roles missing from the cache (deleted ones) go last."""
+
+    def position(role_id: hikari.Snowflake) -> int:
+        return role.position if (role := cache.get_role(role_id)) is not None else -1
+
+    return " ".join(f"<@&{role_id}>" for role_id in sorted(role_ids, key=position, reverse=True))
+
+
 @component.with_listener(hikari.MemberUpdateEvent)
+@ordered(by_guild)
 async def lsnr_ban_create(
     event: hikari.MemberUpdateEvent,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
     db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    log_sink: LogSink = tanjun.inject(type=LogSink),
 ) -> None:
     """Member update event listener."""
-    if event.old_member is None:
+    if event.old_member is None or db.should_shed():
+        return
+    # Checked before the config lookup, most member updates change nothing that is logged
+    if not has_logged_changes(event.old_member, event.member):
         return
-    if (
-        config := await db.row("SELECT * FROM guild_config WHERE guild_id = $1", event.guild_id, record_cls=GuildConfig)
-    ) is None or config.log_channel_id is None:
+    if (config := await configs.get(event.guild_id)).log_channel_id is None:
         return
 
     old = event.old_member
@@ -35,25 +52,28 @@ async def lsnr_ban_create(
     fields: FieldsT = []
     image = None
 
-    if old.avatar_url != new.avatar_url:
+    if old.avatar_hash != new.avatar_hash:
         if old.avatar_url is not None:
             fields.append(("New Profile Picture", "Old profile picture attached below", True))
             image = old.avatar_url
         else:
             fields.append(("New Profile Picture", "This user has not had a profile picture before.", True))
 
-    if old.display_avatar_url != new.display_avatar_url:
-        if old.display_avatar_url is not None:
+    if old.guild_avatar_hash != new.guild_avatar_hash:
+        if old.guild_avatar_url is not None:
             fields.append(("New Server Profile Picture", "Old profile picture attached below", True))
-            image = old.display_avatar_url
+            image = old.guild_avatar_url
         else:
             fields.append(("New Server Profile Picture", "This user has not had a profile picture before.", True))
 
-    if (r1 := old.get_roles()) != (
-        r2 := await new.fetch_roles()
-    ):  # Don't fetch old roles because those would be the new ones
-        difference = set(r1).symmetric_difference(set(r2))
-        fields.append(("Role Update", " ".join(r.mention for r in difference), True))
+    added, removed = role_changes(old, new)
+    if added or removed:
+        lines = []
+        if added:
+            lines.append(f"Added: {_mention_roles(added, bot.cache)}")
+        if removed:
+            lines.append(f"Removed: {_mention_roles(removed, bot.cache)}")
+        fields.append(("Role Update", "\n".join(lines), True))
 
     if old.nickname != new.nickname:
         fields.append(("Nickname Update", f"Old nick: {old.nickname}\nNew nick: {new.nickname}", True))
@@ -70,5 +90,7 @@ async def lsnr_ban_create(
             )
         )
 
+    if not fields:
+        return
     embed = EmbedFactory.build(event, bot, title="User Update", fields=fields, image=image)
-    await bot.rest.create_message(config.log_channel_id, embed=embed)
+    log_sink.send(config.log_channel_id, embed)
@@ -0,0 +1,125 @@
+# -*- coding=utf-8 -*-
+"""Bulk message delete event listener."""
+
+import collections
+import datetime
+import logging
+import typing as t
+import zlib
+
+import hikari
+import tanjun
+
+from ottbot.constants import Colors
+from ottbot.db import AsyncPGDatabase, GuildConfigService
+from ottbot.utils.audit_logs import AuditLogCache
+from ottbot.utils.dispatch import by_guild, ordered
+from ottbot.utils.embeds import EmbedFactory, FieldsT
+from ottbot.utils.funcs import build_loaders, format_time, full_name
+from ottbot.utils.message_store import MessageStore, StoredMessage
+
+component, load_component, unload_component = build_loaders()
+logger = logging.getLogger(__name__)
+
+TOP_AUTHORS = 5
+
+
+def _render(message: hikari.Message | StoredMessage) -> str:
+    """Render a deleted message as a transcript entry, from hikari's cache or the message store."""
+    if isinstance(message, StoredMessage):
+        author, author_id, attachments, embeds = message.author_name, message.author_id, message.attachments, 0
+    else:
+        author, author_id = full_name(message.author), message.author.id
+        attachments, embeds = tuple(attachment.url for attachment in message.attachments), len(message.embeds)
+
+    line = f"[{message.created_at:%Y-%m-%d %H:%M:%S}] {author} ({author_id}): "
+    line += (message.content or "").replace("\n", "\n    ")
+    for url in attachments:
+        line += f"\n    [attachment] {url}"
+    if embeds:
+        line += f"\n    [{embeds} embeds]"
+    return line
+
+
+def _transcript(messages: t.Iterable[hikari.Message | StoredMessage], missing: int) -> t.Iterator[bytes]:
+    """Render deleted messages as a gzip compressed text transcript.
+
+    Each message is compressed as soon as it's rendered, so only compressed chunks are ever held in memory.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    for message in messages:
+        line = _render(message)
+        if chunk := compressor.compress(f"{line}\n".encode()):
+            yield chunk
+
+    if missing:
+        yield compressor.compress(f"\n{missing} messages weren't cached and can't be shown.\n".encode())
+    yield compressor.flush()
+
+
+@component.with_listener(hikari.GuildBulkMessageDeleteEvent)
+@ordered(by_guild)
+async def lsnr_guild_bulk_message_delete(
+    event: hikari.GuildBulkMessageDeleteEvent,
+    bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
+    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    audit_logs: AuditLogCache = tanjun.inject(type=AuditLogCache),
+    message_store: MessageStore = tanjun.inject(type=MessageStore),
+) -> None:
+    """Log a purge as a single summary embed with the deleted messages attached as a transcript."""
+    # Messages hikari's cache already evicted may still be in the store, which must forget all of them either way
+    messages: list[hikari.Message | StoredMessage] = list(event.old_messages.values())
+    for message_id in event.message_ids:
+        if message_id not in event.old_messages and (stored := await message_store.get(message_id)) is not None:
+            messages.append(stored)
+        message_store.remove(message_id)
+    if db.should_shed():
+        return
+    deleted_at = datetime.datetime.now().astimezone()
+    guild_config = await configs.get(event.guild_id)
+    if guild_config.log_channel_id is None:
+        return
+
+    messages.sort(key=lambda m: m.id)
+    missing = len(event.message_ids) - len(messages)
+    authors = collections.Counter(
+        message.author_id if isinstance(message, StoredMessage) else message.author.id for message in messages
+    )
+
+    title = f"{len(event.message_ids)} messages deleted"
+    if (ch := event.get_channel()) is not None:
+        title += f" in #{ch.name}"
+
+    fields: FieldsT = [
+        ("Messages", f"{len(messages)} cached, {missing} unknown", True),
+        ("Deleted At", format_time(deleted_at, "f"), True),
+    ]
+    entry = await audit_logs.find(
+        event.guild_id, hikari.AuditLogEventType.MESSAGE_BULK_DELETE, target_id=event.channel_id
+    )
+    if entry is not None and entry.user_id is not None:
+        fields.append(("Deleted By", f"<@{entry.user_id}>", True))
+    if authors:
+        fields.append(
+            (
+                "Authors",
+                "\n".join(f"<@{author_id}>: {count}" for author_id, count in authors.most_common(TOP_AUTHORS))
+                + (f"\n+{len(authors) - TOP_AUTHORS} more" if len(authors) > TOP_AUTHORS else ""),
+                False,
+            )
+        )
+
+    embed = EmbedFactory.build(
+        event,
+        bot,
+        title=title,
+        desc=f"Channel: <#{event.channel_id}>",
+        color=Colors.INFO,
+        fields=fields,
+        footer=f"Channel ID: {event.channel_id}",
+    )
+    transcript = hikari.Bytes(
+        _transcript(messages, missing), f"bulk-delete-{event.channel_id}-{int(deleted_at.timestamp())}.txt.gz"
+    )
+    await bot.rest.create_message(guild_config.log_channel_id, embed=embed, attachment=transcript)
@@ -4,12 +4,10 @@
 import logging
 
 import hikari
+import tanjun
 
-# from ottbot.db import AsyncPGDatabase, GuildConfig
 from ottbot.utils.funcs import build_loaders
-
-# import sake
-# import tanjun
+from ottbot.utils.message_store import MessageStore
 
 component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
@@ -18,12 +16,10 @@ logger = logging.getLogger(__name__)
 @component.with_listener(hikari.GuildMessageCreateEvent)
 async def lsnr_guild_message_create(
     event: hikari.GuildMessageCreateEvent,
-    # bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
-    # redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
-    # db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    message_store: MessageStore = tanjun.inject(type=MessageStore),
 ) -> None:
-    """On member join event listener."""
+    """Keep a copy of the message, so its edit and delete logs still work once the cache evicts it."""
     if not event.is_human:
         return
 
-    # logger.info(f"Message create {event.message.content}")
+    message_store.add(event.message, event.guild_id)
@@ -7,35 +7,42 @@ import logging
 import hikari
 import sake
 import tanjun
-from hikari import audit_logs as hikari_audit_logs
 
 from ottbot.constants import Colors
-from ottbot.db import AsyncPGDatabase, GuildConfig
+from ottbot.db import AsyncPGDatabase, GuildConfigService
+from ottbot.utils.audit_logs import AuditLogCache
+from ottbot.utils.dispatch import by_guild, ordered
 from ottbot.utils.embeds import ESCAPE_NAME as EMBED_ESCAPE_NAME
 from ottbot.utils.embeds import EmbedFactory, FieldsT
 from ottbot.utils.funcs import build_loaders, format_time, full_name
+from ottbot.utils.log_sink import LogSink
+from ottbot.utils.message_store import MessageStore
 
 component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
 
 
 @component.with_listener(hikari.GuildMessageDeleteEvent)
+@ordered(by_guild)
 async def lsnr_guild_message_delete(
     event: hikari.GuildMessageDeleteEvent,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
     db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    audit_logs: AuditLogCache = tanjun.inject(type=AuditLogCache),
+    log_sink: LogSink = tanjun.inject(type=LogSink),
+    message_store: MessageStore = tanjun.inject(type=MessageStore),
 ) -> None:
     """On message delete event listener."""
+    # Fall back to the stored copy when the cache already evicted the message
+    stored = await message_store.get(event.message_id) if event.old_message is None else None
+    message_store.remove(event.message_id)
+    if db.should_shed():
+        return
     deleted_at = datetime.datetime.now().astimezone()
     # Get channel to send log message in
-    if (
-        guild_config := await db.row(
-            "SELECT * FROM guild_config WHERE guild_id = $1", event.guild_id, record_cls=GuildConfig
-        )
-    ) is None:
-        logger.error("No guild config")
-        return
+    guild_config = await configs.get(event.guild_id)
     if guild_config.log_channel_id is None:
         logger.error("No log channel")
         return
@@ -59,19 +66,34 @@ async def lsnr_guild_message_delete(
             ("Author", author.mention, True),
             ("Created At", format_time(message.created_at, "f"), True),
         ]
+    elif stored is not None:
+        header_text = stored.author_name
+        header_icon = stored.author_avatar_url
+        if stored.content:
+            fields.append(("Content", stored.content, False))
+        fields += [
+            ("Author", stored.author_mention, True),
+            ("Created At", format_time(stored.created_at, "f"), True),
+        ]
     else:
         header_icon = header_text = "None"
     fields.append(("Deleted At", format_time(deleted_at, "f"), True))
 
     # try to get who deleted the message from the audit logs
     # if there is not audit log entry, we can assume the user deleted it themselves
-    audit_logs = bot.rest.fetch_audit_log(event.guild_id, event_type=hikari_audit_logs.AuditLogEventType.MESSAGE_DELETE)
-    entries = (await audit_logs.last()).entries
-    delete_entries = sorted(entries.values(), key=lambda x: x.created_at, reverse=True)
-    if (entry := delete_entries[0]).created_at - datetime.datetime.now().astimezone() < datetime.timedelta(seconds=3):
+    # that's the common case, so a miss doesn't wait for a new fetch while holding up the guild's other events
+    author_id = event.old_message.author.id if event.old_message and event.old_message.author else None
+    if author_id is None and stored is not None:
+        author_id = stored.author_id
+    entry = await audit_logs.find(
+        event.guild_id, hikari.AuditLogEventType.MESSAGE_DELETE, target_id=author_id, within=3, wait=False
+    )
+    if entry is not None:
         deleted_by = f"<@{entry.user_id}>" if entry.user_id else None
     else:
         deleted_by = event.old_message.author.mention if event.old_message and event.old_message.author else None
+        if deleted_by is None and stored is not None:
+            deleted_by = stored.author_mention
     if deleted_by is not None:
         fields.append(("Deleted By", deleted_by, True))
 
@@ -90,4 +112,4 @@ async def lsnr_guild_message_delete(
     )
 
     # Send message
-    await bot.rest.create_message(guild_config.log_channel_id, embed=embed)
+    log_sink.send(guild_config.log_channel_id, embed)
@@ -1,59 +1,71 @@
 # -*- coding=utf-8 -*-
 """Message edit event listener."""
 
-import difflib
 import logging
 
 import hikari
 import sake
 import tanjun
 
-from ottbot.constants import ZWJ, Colors
-from ottbot.db import AsyncPGDatabase, GuildConfig
+from ottbot.constants import Colors
+from ottbot.db import AsyncPGDatabase, GuildConfigService
+from ottbot.utils.diff import DiffEngine, truncate
+from ottbot.utils.dispatch import by_guild, ordered
 from ottbot.utils.embeds import EmbedFactory
 from ottbot.utils.funcs import build_loaders, full_name, get_member, message_link
+from ottbot.utils.log_sink import LogSink
+from ottbot.utils.message_store import MessageStore
 
 component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
 
 
 @component.with_listener(hikari.GuildMessageUpdateEvent)
+@ordered(by_guild)
 async def lsnr_guild_message_edit(
     event: hikari.GuildMessageUpdateEvent,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     redis: sake.RedisCache = tanjun.inject(type=sake.RedisCache),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
     db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    log_sink: LogSink = tanjun.inject(type=LogSink),
+    message_store: MessageStore = tanjun.inject(type=MessageStore),
+    diffs: DiffEngine = tanjun.inject(type=DiffEngine),
 ) -> None:
     """On message edit event listener."""
     if not event.is_human:
         return
+
+    # Keep the stored copy current, it's the only record of the old content once the cache evicts the message
+    stored = None
+    if isinstance(event.message.content, str):
+        stored = await message_store.edit(event.message_id, event.message.content)
+    if db.should_shed():
+        return
     logger.info(f"Message Edit in {event.guild_id}")
 
     # Get channel to send log message in
-    if (
-        guild_config := await db.row(
-            "SELECT * FROM guild_config WHERE guild_id = $1", event.guild_id, record_cls=GuildConfig
-        )
-    ) is None:
-        return
+    guild_config = await configs.get(event.guild_id)
     if guild_config.log_channel_id is None:
         return
 
     # Calculate diff
-    if event.old_message is None:
+    if event.old_message is not None:
+        old_content = event.old_message.content
+    elif stored is not None:
+        old_content = stored.content
+    else:
+        old_content = None
         logger.error("No old message")
 
-    diff = difflib.Differ().compare(
-        event.old_message.content.split("\n") if event.old_message and event.old_message.content else [""],
-        event.message.content.split("\n") if event.message.content else [""],
-    )
-    diff_txt = "\n".join(diff).replace("```", f"``{ZWJ}`")
+    new_content = event.message.content or ""
+    diff = await diffs.render(old_content or "", new_content)
 
     # Construct message
     fields = [
-        ("Before", event.old_message.content if event.old_message and event.old_message.content else "", False),
-        ("After", event.message.content or "", False),
-        ("Diff", f"```diff\n{diff_txt}```", False),
+        ("Before", truncate(old_content or ""), False),
+        ("After", truncate(new_content), False),
+        ("Diff", diff, False),
     ]
 
     if event.author_id is not hikari.UNDEFINED:
@@ -79,4 +91,4 @@ async def lsnr_guild_message_edit(
     )
 
     # Send message
-    await bot.rest.create_message(guild_config.log_channel_id, embed=embed)
+    log_sink.send(guild_config.log_channel_id, embed)
@@ -1,6 +1,7 @@
 # -*- coding=utf-8 -*-
 """Send the autorole message."""
 import logging
+import typing as t
 
 import hikari
 import tanjun
@@ -14,6 +15,32 @@ component, load_component, unload_component = build_loaders()
 logger = logging.getLogger(__name__)
 
 
+def _mention_roles(role_ids: t.Iterable[hikari.Snowflake]) -> str:
+    return ", ".join(f"<@&{role_id}>" for role_id in sorted(role_ids))
+
+
+def _current_roles(app: hikari.RESTAware, member: hikari.InteractionMember) -> set[hikari.Snowflake]:
+    """The member's roles without @everyone, from the cache when it has them since the interaction is a snapshot."""
+    role_ids = member.role_ids
+    if isinstance(app, hikari.CacheAware) and (cached := app.cache.get_member(member.guild_id, member.id)) is not None:
+        role_ids = cached.role_ids
+    return {role_id for role_id in role_ids if role_id != member.guild_id}
+
+
+def _can_assign(app: hikari.RESTAware, guild_id: hikari.Snowflake, role_id: hikari.Snowflake) -> bool:
+    """Whether the bot can give a role, according to the cache. Assumes it can when something isn't cached."""
+    if not isinstance(app, hikari.CacheAware):
+        return True
+    if (me := app.cache.get_me()) is None or (bot_member := app.cache.get_member(guild_id, me)) is None:
+        return True
+    if (role := app.cache.get_role(role_id)) is None:
+        return app.cache.get_guild(guild_id) is None
+    if role.guild_id != guild_id or role.is_managed:
+        return False
+    top_role = bot_member.get_top_role()
+    return top_role is None or role.position < top_role.position
+
+
 async def _add_role(
     ctx: yuyo.ComponentContext,
 ) -> None:
@@ -73,35 +100,40 @@ async def cmd_send_autorole(
     # await ctx.create_initial_response(f"Sent message in <#{channel_id}>, [jump]({msg.make_link(ctx.guild_id)})")
 
     async def cb(ctx: yuyo.ComponentContext) -> None:
-        if ctx.interaction.member is None or ctx.interaction.values is None:
+        member = ctx.interaction.member
+        if member is None or ctx.interaction.values is None:
             return
-
-        added: list[int] = []
-        errored: list[int] = []
-        for id_str in ctx.interaction.values:
-            role_id = int(id_str)
-            try:
-                await ctx.interaction.member.add_role(role_id)
-                added.append(role_id)
-                # await ctx.interaction.create_initial_response(
-                #     hikari.ResponseType.MESSAGE_CREATE, f"Gave you <@&{role_id}>", flags=hikari.MessageFlag.EPHEMERAL
-                # )
-
-            except Exception as e:
-                # await ctx.interaction.create_initial_response(
-                #     hikari.ResponseType.MESSAGE_CREATE, "Not enough permissions.", flags=hikari.MessageFlag.EPHEMERAL
-                # )
-                errored.append(role_id)
-
-                logger.error(e)
-
-        msg = f"Added {', '.join([f'<@&{r}>' for r in added])}"
-        if errored:
-            msg += f"Errored: {', '.join([f'<@&{r}>' for r in added])}"
+        # Editing the member can take longer than the 3 seconds an interaction has to be answered
         await ctx.interaction.create_initial_response(
-            hikari.ResponseType.MESSAGE_CREATE,
+            hikari.ResponseType.DEFERRED_MESSAGE_CREATE, flags=hikari.MessageFlag.EPHEMERAL
         )
 
+        app = ctx.interaction.app
+        selected = {hikari.Snowflake(value) for value in ctx.interaction.values}
+        # Read after deferring, right before the edit, as `roles=` replaces all of the member's roles
+        current = _current_roles(app, member)
+        added = selected - current
+        failed = {role_id for role_id in added if not _can_assign(app, member.guild_id, role_id)}
+        added -= failed
+
+        if added:
+            # A single edit instead of one request per role
+            try:
+                await app.rest.edit_member(member.guild_id, member.id, roles=current | added, reason="auto role")
+            except hikari.HikariError as e:
+                logger.error(f"Failed to add auto roles to {member.id}: {e}")
+                failed |= added
+                added = set()
+
+        lines = []
+        if added:
+            lines.append(f"Added {_mention_roles(added)}")
+        if had := selected & current:
+            lines.append(f"You already have {_mention_roles(had)}")
+        if failed:
+            lines.append(f"Couldn't add {_mention_roles(failed)}")
+        await ctx.interaction.edit_initial_response("\n".join(lines))
+
     row = ctx.rest.build_action_row()
     menu_id = f"AUTOROLE;{ctx.guild_id}"
 
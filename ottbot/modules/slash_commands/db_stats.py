@@ -0,0 +1,82 @@
+# -*- coding=utf-8 -*-
+"""Database query statistics."""
+import json
+import logging
+
+import hikari
+import tanjun
+
+from ottbot.db import AsyncPGDatabase, WriteBehindQueue
+from ottbot.utils.embeds import EmbedFactory, FieldsT
+from ottbot.utils.funcs import build_loaders
+
+component, load_component, unload_component = build_loaders()
+logger = logging.getLogger(__name__)
+
+SORT_CHOICES = {"Total time": "total", "Calls": "calls", "p99 latency": "p99", "Rows": "rows", "Errors": "errors"}
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:,.2f}ms"
+
+
+@component.with_slash_command
+@tanjun.with_owner_check()
+@tanjun.with_bool_slash_option("dump", "Attach every statistic as a json file.", default=False)
+@tanjun.with_bool_slash_option("reset", "Reset the statistics after showing them.", default=False)
+@tanjun.with_str_slash_option("sort", "What to sort statements by.", choices=SORT_CHOICES, default="total")
+@tanjun.as_slash_command("dbstats", "Show database query statistics.", default_to_ephemeral=True)
+async def cmd_dbstats(
+    ctx: tanjun.abc.SlashContext,
+    sort: str,
+    reset: bool,
+    dump: bool,
+    bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
+    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    writes: WriteBehindQueue = tanjun.inject(type=WriteBehindQueue),
+) -> None:
+    """Show the slowest or busiest statements with their latency percentiles."""
+    acquire = db.stats.acquire
+    pool = db.pool_metrics()
+    fields: FieldsT = [
+        (
+            "Pool",
+            f"```{pool['size'] - pool['idle']}/{pool['max_size']} connections busy, {pool['waiting']} waiting"
+            + f"{' (saturated)' if db.saturated else ''}```",
+            False,
+        ),
+        (
+            "Pool acquire",
+            f"```{acquire.count:,} acquires\np50 {_ms(acquire.percentile(50))} / p95 {_ms(acquire.percentile(95))} / "
+            + f"p99 {_ms(acquire.percentile(99))} / max {_ms(acquire.max)}```",
+            False,
+        ),
+        (
+            "Write-behind",
+            f"```{writes.depth:,} pending, {writes.flushed:,} flushed, {writes.failed:,} failed\n"
+            + f"flush p50 {_ms(writes.flush_latency.percentile(50))} / p99 {_ms(writes.flush_latency.percentile(99))} / "
+            + f"max {_ms(writes.flush_latency.max)}```",
+            False,
+        ),
+    ]
+    for q, stats in db.stats.top(10, sort):  # type: ignore[arg-type]
+        latency = stats.latency
+        fields.append(
+            (
+                q[:200],
+                f"```{stats.calls:,} calls, {stats.rows:,} rows, {stats.errors:,} errors, total {_ms(latency.total)}\n"
+                + f"p50 {_ms(latency.percentile(50))} / p95 {_ms(latency.percentile(95))} / "
+                + f"p99 {_ms(latency.percentile(99))} / max {_ms(latency.max)}```",
+                False,
+            )
+        )
+
+    embed = EmbedFactory.build(ctx, bot, title="Database statistics", fields=fields)
+    if dump:
+        data = json.dumps({**db.stats.dump(), "write_behind": writes.metrics()}, indent=2).encode()
+        await ctx.respond(embed=embed, attachment=hikari.Bytes(data, "db_stats.json"))
+    else:
+        await ctx.respond(embed=embed)
+
+    if reset:
+        db.stats.reset()
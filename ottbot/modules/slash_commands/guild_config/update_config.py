@@ -8,8 +8,7 @@
 import hikari
 import tanjun
 
-from ottbot.db import AsyncPGDatabase
-from ottbot.modules.slash_commands.guild_config import get_guild_config
+from ottbot.db import GuildConfigService
 from ottbot.utils.embeds import EmbedFactory, FieldsT
 from ottbot.utils.funcs import build_loaders
 
@@ -22,13 +21,13 @@ config = component.with_slash_command(tanjun.slash_command_group("config", "Bot
 @tanjun.as_slash_command("list", "List the configuration of the guild.")
 async def cmd_config_list(
     ctx: tanjun.abc.SlashContext,
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
 ) -> None:
     """List the configuration in the current guild."""
     if ctx.guild_id is None:
         return
-    config = await get_guild_config(ctx.guild_id, db)
+    config = await configs.get(ctx.guild_id)
     await ctx.respond("Config")
 
     fields: FieldsT = [
@@ -47,13 +46,13 @@ async def cmd_config_list(
 async def cmd_config_welcomechannel(
     ctx: tanjun.abc.SlashContext,
     channel: hikari.TextableGuildChannel,
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
 ) -> None:
     """Update the channel the bot sends welcome messages in."""
     if ctx.guild_id is None:
         return
 
-    await db.execute("UPDATE guild_config SET welcome_channel_id = $1 WHERE guild_id = $2", channel.id, ctx.guild_id)
+    await configs.update(ctx.guild_id, welcome_channel_id=channel.id)
     await ctx.respond(f"Updated `welcome_channel_id` to {channel.id} (<#{channel.id}>)")
 
 
@@ -65,13 +64,13 @@ async def cmd_config_welcomechannel(
 async def cmd_config_log_channel(
     ctx: tanjun.abc.SlashContext,
     channel: hikari.InteractionChannel,
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
 ) -> None:
     """Update the admin log channel."""
     if ctx.guild_id is None:
         return
 
-    await db.execute("UPDATE guild_config SET log_channel_id = $1 WHERE guild_id = $2", channel.id, ctx.guild_id)
+    await configs.update(ctx.guild_id, log_channel_id=channel.id)
     await ctx.respond(f"Updated `log_channel` to <#{channel.id}>")
 
 
@@ -83,11 +82,11 @@ async def cmd_config_log_channel(
 async def cmd_config_starboard_channel(
     ctx: tanjun.abc.SlashContext,
     channel: hikari.InteractionChannel,
-    db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
 ) -> None:
     """Update the starboard channel."""
     if ctx.guild_id is None:
         return
 
-    await db.execute("UPDATE guild_config SET starboard_channel_id = $1 WHERE guild_id = $2", channel.id, ctx.guild_id)
+    await configs.update(ctx.guild_id, starboard_channel_id=channel.id)
     await ctx.respond(f"Updated `log_channel` to <#{channel.id}>")
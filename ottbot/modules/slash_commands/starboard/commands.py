@@ -0,0 +1,121 @@
+# -*- coding=utf-8 -*-
+"""Starboard commands.
+
+/starboard backfill
+/starboard top
+"""
+import datetime
+
+import hikari
+import tanjun
+import yuyo
+
+from ottbot.constants import Colors
+from ottbot.db import GuildConfigService, StarboardService
+from ottbot.utils.funcs import build_loaders, message_link
+from ottbot.utils.starboard import BackfillProgress, StarboardBackfill
+
+component, load_component, unload_component = build_loaders()
+
+starboard = component.with_slash_command(tanjun.slash_command_group("starboard", "Starboard commands."))
+
+WINDOWS: dict[str, datetime.timedelta | None] = {
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(weeks=1),
+    "month": datetime.timedelta(days=30),
+    "all": None,
+}
+LEADERBOARD_SIZE = 100
+PAGE_SIZE = 10
+
+
+@starboard.with_command
+@tanjun.with_author_permission_check(hikari.Permissions.ADMINISTRATOR)
+@tanjun.with_bool_slash_option("restart", "Scan from the start instead of where the last scan stopped.", default=False)
+@tanjun.with_int_slash_option("threshold", "Stars a message needs to be posted.", default=3, min_value=1)
+@tanjun.with_channel_slash_option("channel", "The channel to scan.", types=(hikari.TextableGuildChannel,))
+@tanjun.as_slash_command("backfill", "Post the messages of a channel that were starred before the starboard existed.")
+async def cmd_starboard_backfill(
+    ctx: tanjun.abc.SlashContext,
+    channel: hikari.InteractionChannel,
+    threshold: int,
+    restart: bool,
+    bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
+    backfill: StarboardBackfill = tanjun.inject(type=StarboardBackfill),
+) -> None:
+    """Scan a channel's history in the background and post every message with enough stars."""
+    if ctx.guild_id is None:
+        return
+    if (await configs.get(ctx.guild_id)).starboard_channel_id is None:
+        await ctx.respond("Set a starboard channel with `/config starboard-channel` first")
+        return
+
+    if (running := backfill.progress(channel.id)) is not None:
+        await ctx.respond(
+            f"Already scanning <#{channel.id}>, {running.scanned:,} messages scanned and {running.posted:,} posted"
+        )
+        return
+
+    # The scan can take longer than the interaction token lives, so the result is sent as a new message
+    async def report(progress: BackfillProgress) -> None:
+        status = f"stopped, run it again to resume ({progress.error})" if progress.error else "finished"
+        await bot.rest.create_message(
+            ctx.channel_id,
+            f"Starboard backfill of <#{progress.channel_id}> {status}: "
+            f"{progress.scanned:,} messages scanned, {progress.posted:,} posted",
+        )
+
+    progress = await backfill.start(ctx.guild_id, channel.id, threshold=threshold, restart=restart, on_done=report)
+    resumed = f" from message {progress.resumed_from}" if progress.resumed_from else ""
+    await ctx.respond(f"Scanning <#{channel.id}>{resumed} for messages with at least {threshold} stars")
+
+
+@starboard.with_command
+@tanjun.with_str_slash_option(
+    "window", "Only count messages sent in this time, in whole UTC days.", choices=list(WINDOWS), default="all"
+)
+@tanjun.with_str_slash_option("kind", "What to rank.", choices=["messages", "authors"], default="messages")
+@tanjun.as_slash_command("top", "The most starred messages or authors of this server.")
+async def cmd_starboard_top(
+    ctx: tanjun.abc.SlashContext,
+    kind: str,
+    window: str,
+    posts: StarboardService = tanjun.inject(type=StarboardService),
+    component_client: yuyo.ComponentClient = tanjun.inject(type=yuyo.ComponentClient),
+) -> None:
+    """Show a paginated leaderboard, read from the aggregates the starboard keeps up to date."""
+    if ctx.guild_id is None:
+        return
+
+    since = datetime.datetime.now(datetime.timezone.utc) - delta if (delta := WINDOWS[window]) else None
+    lines: list[str]
+    if kind == "authors":
+        authors = await posts.top_authors(ctx.guild_id, since=since, limit=LEADERBOARD_SIZE)
+        lines = [
+            f"**{rank}.** <@{a.author_id}> {a.stars:,} \N{WHITE MEDIUM STAR} on {a.messages:,} messages"
+            for rank, a in enumerate(authors, 1)
+        ]
+    else:
+        messages = await posts.top_messages(ctx.guild_id, since=since, limit=LEADERBOARD_SIZE)
+        lines = [
+            f"**{rank}.** {m.star_count:,} \N{WHITE MEDIUM STAR} by <@{m.author_id}> "
+            f"[Jump]({message_link(ctx.guild_id, m.original_channel_id, m.original_message_id)})"
+            for rank, m in enumerate(messages, 1)
+        ]
+    if not lines:
+        await ctx.respond("Nothing has been starred yet")
+        return
+
+    title = f"Most starred {kind}" + (f" of the last {window}" if since else "")
+    page_count = (len(lines) - 1) // PAGE_SIZE + 1
+    pages: list[tuple[hikari.UndefinedType, hikari.Embed]] = []
+    for i in range(0, len(lines), PAGE_SIZE):
+        embed = hikari.Embed(title=title, description="\n".join(lines[i : i + PAGE_SIZE]), color=Colors.YELLOW)
+        pages.append((hikari.UNDEFINED, embed.set_footer(f"Page {i // PAGE_SIZE + 1}/{page_count}")))
+
+    paginator = yuyo.ComponentPaginator(iter(pages), authors=(ctx.author.id,))
+    first_page = await paginator.get_next_entry()
+    assert first_page, "there is at least one page"
+    message = await ctx.respond(content=first_page[0], embed=first_page[1], component=paginator, ensure_result=True)
+    component_client.set_executor(message, paginator)
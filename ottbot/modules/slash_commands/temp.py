@@ -12,9 +12,15 @@ from psutil import Process, virtual_memory
 
 from ottbot import VERSION, logger
 from ottbot.constants import ZWJ
-from ottbot.db import AsyncPGDatabase
+from ottbot.db import AsyncPGDatabase, GuildConfigService
+from ottbot.utils.audit_logs import AuditLogCache
+from ottbot.utils.diff import DiffEngine
+from ottbot.utils.dispatch import EventDispatcher
 from ottbot.utils.embeds import ESCAPE_NAME, EmbedFactory, FieldsT
 from ottbot.utils.funcs import build_loaders
+from ottbot.utils.log_sink import LogSink
+from ottbot.utils.message_store import MessageStore
+from ottbot.utils.starboard import StarboardTracker
 
 component, load_component, unload_component = build_loaders(__name__)
 
@@ -48,6 +54,13 @@ async def cmd_stats(
     ctx: tanjun.abc.SlashContext,
     bot: hikari.GatewayBot = tanjun.inject(type=hikari.GatewayBot),
     db: AsyncPGDatabase = tanjun.inject(type=AsyncPGDatabase),
+    configs: GuildConfigService = tanjun.inject(type=GuildConfigService),
+    audit_logs: AuditLogCache = tanjun.inject(type=AuditLogCache),
+    log_sink: LogSink = tanjun.inject(type=LogSink),
+    message_store: MessageStore = tanjun.inject(type=MessageStore),
+    diffs: DiffEngine = tanjun.inject(type=DiffEngine),
+    dispatcher: EventDispatcher = tanjun.inject(type=EventDispatcher),
+    starboard: StarboardTracker = tanjun.inject(type=StarboardTracker),
 ) -> None:
     """Bot statistics."""
     proc = Process()
@@ -98,6 +111,63 @@ async def cmd_stats(
             f"```{db.calls:,} ({db.calls / (uptime.total_seconds() / 60):,.6f}" + " / minute)```",
             False,
         ),
+        (
+            "Statement cache",
+            f"```{db.statement_cache_hits:,} hits / {db.statement_cache_misses:,} misses "
+            + f"(up to {db.config.statement_cache_size:,} per connection)```",
+            False,
+        ),
+        (
+            "Guild config cache",
+            f"```{(m := configs.metrics())['hits']:,} hits / {m['misses']:,} misses / {m['writes']:,} writes / "
+            + f"{m['invalidations']:,} invalidations "
+            + f"({m['hit_rate']:.1%}), oldest entry {m['max_age']:,.0f}s```",
+            False,
+        ),
+        (
+            "Audit log cache",
+            f"```{(a := audit_logs.metrics())['hits']:,} hits / {a['misses']:,} misses / {a['fetches']:,} fetches "
+            + f"({a['entries']:,} entries)```",
+            False,
+        ),
+        (
+            "Log sink",
+            f"```{log_sink.sent:,} embeds in {log_sink.messages:,} messages, {log_sink.failed:,} failed, "
+            + f"{sum(log_sink.backlog().values()):,} queued```",
+            False,
+        ),
+        (
+            "Message store",
+            f"```{(s := message_store.metrics())['hits']:,} hits / {s['misses']:,} misses / "
+            + f"{s['written']:,} written, {s['pending']:,} pending```",
+            False,
+        ),
+        (
+            "Edit diffs",
+            f"```{diffs.fast:,} fast / {diffs.inline:,} inline / {diffs.offloaded:,} offloaded / "
+            + f"{diffs.skipped:,} skipped, {diffs.timings.total * 1000:,.0f} ms total "
+            + f"(p99 {diffs.timings.percentile(99) * 1000:,.2f} ms)```",
+            False,
+        ),
+        (
+            "Event queues",
+            f"```{(q := dispatcher.metrics())['running']:,} running / {q['queued']:,} queued in {q['queues']:,} queues "
+            + f"(deepest {q['max_depth']:,}), {q['dropped']:,} dropped, "
+            + f"p99 wait {dispatcher.wait_latency.percentile(99) * 1000:,.0f} ms```",
+            False,
+        ),
+        (
+            "Starboard",
+            f"```{(b := starboard.metrics())['events']:,} star events / {b['publishes']:,} publishes / "
+            + f"{b['fetches']:,} fetches ({b['pending']:,} pending)```",
+            False,
+        ),
+        (
+            "Starboard posts",
+            f"```{(p := starboard.posts.metrics())['hits']:,} hits / {p['misses']:,} misses / "
+            + f"{p['rejected']:,} rejected by filter ({p['cached']:,} cached)```",
+            False,
+        ),
     ]
     embed = EmbedFactory.build(
         ctx,
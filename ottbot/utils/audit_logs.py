@@ -0,0 +1,150 @@
+# -*- coding=utf-8 -*-
+"""Shared cache of recent audit log entries."""
+import asyncio
+import collections
+import datetime
+import logging
+import time
+import typing as t
+
+import hikari
+
+__all__ = ("AuditLogCache",)
+
+logger = logging.getLogger(__name__)
+
+_KeyT = tuple[int, hikari.AuditLogEventType]
+
+
+class _GuildLog:
+    __slots__ = ("entries", "newest_id", "refreshed_at", "refreshing")
+
+    def __init__(self, max_entries: int) -> None:
+        self.entries: collections.deque[hikari.AuditLogEntry] = collections.deque(maxlen=max_entries)
+        """Newest entry first."""
+        self.newest_id: hikari.Snowflake | None = None
+        self.refreshed_at: float = float("-inf")
+        """When the last fetch started, entries created before then are in `entries`."""
+        self.refreshing: asyncio.Task[None] | None = None
+
+
+class AuditLogCache:
+    """Recent audit log entries per guild and event type, shared by every moderation listener.
+
+    Each guild's log is fetched at most once every `min_interval` seconds, only reading
+    entries newer than the newest one already known. Concurrent lookups share a single
+    fetch, so a purge of 100 messages costs one request instead of 100. A lookup that misses
+    waits for a fetch that started after it was made, so bursts of events still find their entries,
+    unless it's for an event that usually has no entry and passes `wait=False`.
+
+    ```python
+    entry = await audit_logs.find(guild_id, hikari.AuditLogEventType.MEMBER_KICK, target_id=user_id)
+    ```
+    """
+
+    __slots__ = ("rest", "min_interval", "max_entries", "hits", "misses", "fetches", "_logs")
+
+    def __init__(self, rest: hikari.api.RESTClient, *, min_interval: float = 2.0, max_entries: int = 100) -> None:
+        """Create a new audit log cache."""
+        self.rest: hikari.api.RESTClient = rest
+        self.min_interval: float = min_interval
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self.fetches: int = 0
+        self._logs: dict[_KeyT, _GuildLog] = {}
+
+    def _log(self, guild_id: hikari.Snowflakeish, event_type: hikari.AuditLogEventType) -> _GuildLog:
+        if (log := self._logs.get(key := (int(guild_id), event_type))) is None:
+            log = self._logs[key] = _GuildLog(self.max_entries)
+        return log
+
+    async def _refresh(
+        self, guild_id: hikari.Snowflakeish, event_type: hikari.AuditLogEventType, log: _GuildLog
+    ) -> None:
+        self.fetches += 1
+        log.refreshed_at = time.monotonic()
+        new: list[hikari.AuditLogEntry] = []
+        async for page in self.rest.fetch_audit_log(guild_id, event_type=event_type):
+            entries = sorted(page.entries.values(), key=lambda e: e.id, reverse=True)
+            fresh = [e for e in entries if log.newest_id is None or e.id > log.newest_id]
+            new += fresh
+            # Pages are newest first, stop at the first one that reaches known entries
+            if len(fresh) < len(entries) or not entries or len(new) >= self.max_entries:
+                break
+
+        if new:
+            log.newest_id = new[0].id
+            log.entries.extendleft(reversed(new))
+
+    async def entries(
+        self, guild_id: hikari.Snowflakeish, event_type: hikari.AuditLogEventType, *, after: float | None = None
+    ) -> t.Sequence[hikari.AuditLogEntry]:
+        """Get the recent entries of a type, newest first, refreshing them if they're older than `min_interval`.
+
+        With `after`, a `time.monotonic()` timestamp, the entries come from a fetch that started after it,
+        waiting until `min_interval` passed since the last fetch when needed.
+        """
+        log = self._log(guild_id, event_type)
+        while True:
+            if log.refreshing is not None:
+                try:
+                    await asyncio.shield(log.refreshing)
+                except hikari.HikariError as e:
+                    logger.warning(f"Failed to fetch {event_type} audit logs of {guild_id}: {e!r}")
+                    return log.entries
+                continue
+
+            if log.refreshed_at >= (after if after is not None else time.monotonic() - self.min_interval):
+                return log.entries
+            if (wait := log.refreshed_at + self.min_interval - time.monotonic()) > 0:
+                # Another lookup may start the fetch while this one waits
+                await asyncio.sleep(wait)
+                continue
+
+            log.refreshing = asyncio.create_task(self._refresh(guild_id, event_type, log))
+            log.refreshing.add_done_callback(lambda _: setattr(log, "refreshing", None))
+
+    async def find(
+        self,
+        guild_id: hikari.Snowflakeish,
+        event_type: hikari.AuditLogEventType,
+        *,
+        target_id: hikari.Snowflakeish | None = None,
+        within: float = 10.0,
+        wait: bool = True,
+    ) -> hikari.AuditLogEntry | None:
+        """Find out who did something, the newest matching entry created in the last `within` seconds.
+
+        Answered from memory when the entry is already cached, otherwise from a refresh of
+        the log that started after this call, which may wait up to `min_interval` seconds.
+        With `wait=False` a miss is answered from a fetch at most `min_interval` old instead.
+        """
+        called_at = time.monotonic()
+
+        def match(entries: t.Iterable[hikari.AuditLogEntry]) -> hikari.AuditLogEntry | None:
+            since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=within)
+            for entry in entries:
+                if entry.created_at < since:
+                    return None
+                if target_id is None or entry.target_id == target_id:
+                    return entry
+            return None
+
+        log = self._log(guild_id, event_type)
+        if (entry := match(log.entries)) is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return match(await self.entries(guild_id, event_type, after=called_at if wait else None))
+
+    def metrics(self) -> dict[str, int]:
+        """Cache metrics for the stats command."""
+        return {
+            "logs": len(self._logs),
+            "entries": sum(len(log.entries) for log in self._logs.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+        }
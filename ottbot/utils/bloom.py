@@ -0,0 +1,58 @@
+# -*- coding=utf-8 -*-
+"""Bloom filter of integer ids."""
+import math
+import typing as t
+
+__all__ = ("BloomFilter",)
+
+_MASK: t.Final[int] = (1 << 64) - 1
+
+
+def _mix(x: int) -> int:
+    """splitmix64 finalizer, spreads snowflakes (which share most of their high bits) over every bit."""
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK
+    return x ^ (x >> 31)
+
+
+class BloomFilter:
+    """A set of integers that answers "definitely not in the set" without false negatives.
+
+    Sized for `capacity` items at a false positive rate of `error_rate`, adding more
+    items than that keeps working but raises the false positive rate. Items can't be removed.
+    """
+
+    __slots__ = ("capacity", "size", "hashes", "count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        """Create an empty filter."""
+        self.capacity: int = max(1, capacity)
+        self.size: int = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        """Number of bits."""
+        self.hashes: int = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count: int = 0
+        self._bits: bytearray = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item: int) -> t.Iterator[int]:
+        # Double hashing, k indexes from two hashes (Kirsch & Mitzenmacher)
+        h1 = _mix(item)
+        h2 = _mix(item ^ 0x9E3779B97F4A7C15) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: int) -> None:
+        """Add an item."""
+        for index in self._indexes(item):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item: int) -> bool:
+        return all(self._bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Expected false positive rate with the items added so far."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
@@ -0,0 +1,173 @@
+# -*- coding=utf-8 -*-
+"""Bounded diffs of message edits for the log channel."""
+import asyncio
+import concurrent.futures
+import difflib
+import re
+import time
+import typing as t
+
+from ottbot.constants import ZWJ
+from ottbot.utils.metrics import LatencyHistogram
+
+__all__ = ("DiffEngine", "GranularityT", "MAX_FIELD_LENGTH", "truncate")
+
+GranularityT = t.Literal["word", "char"]
+
+MAX_FIELD_LENGTH: t.Final[int] = 1024
+"""Most characters Discord allows in the value of an embed field."""
+
+_WORDS: t.Final[re.Pattern[str]] = re.compile(r"\s+|\S+")
+_FENCE: t.Final[str] = "```diff\n{}```"
+
+
+def truncate(text: str, limit: int = MAX_FIELD_LENGTH, *, suffix: str = "…") -> str:
+    """Cut text down to at most `limit` characters, marking where it was cut."""
+    return text if len(text) <= limit else text[: limit - len(suffix)] + suffix
+
+
+def _escape(text: str) -> str:
+    return text.replace("```", f"``{ZWJ}`")
+
+
+def _marked(marker: str, chunk: str) -> str:
+    # Whitespace only changes would render as empty lines, so show those escaped instead
+    chunk = chunk.strip() or repr(chunk)
+    # Continuation lines get the marker too, otherwise the diff highlighting stops at the first newline
+    return "\n".join(f"{marker} {line}" for line in chunk.split("\n"))
+
+
+def _tokenize(text: str, granularity: GranularityT) -> t.Sequence[str]:
+    return _WORDS.findall(text) if granularity == "word" else text
+
+
+def _compare(old: str, new: str, granularity: GranularityT) -> list[str]:
+    a, b = _tokenize(old, granularity), _tokenize(new, granularity)
+    changes: list[str] = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+        if tag == "equal":
+            continue
+        if i1 != i2:
+            changes.append(_marked("-", "".join(a[i1:i2])))
+        if j1 != j2:
+            changes.append(_marked("+", "".join(b[j1:j2])))
+    return changes
+
+
+def _fast_path(old: str, new: str) -> list[str] | None:
+    """Changes of edits that only add or remove text at one end, found without diffing."""
+    if new.startswith(old):
+        return [_marked("+", new[len(old) :])]
+    if old.startswith(new):
+        return [_marked("-", old[len(new) :])]
+    if new.endswith(old):
+        return [_marked("+", new[: len(new) - len(old)])]
+    if old.endswith(new):
+        return [_marked("-", old[: len(old) - len(new)])]
+    return None
+
+
+class DiffEngine:
+    """Renders edits as diff code blocks that fit into an embed field.
+
+    Appending or cutting text is answered without diffing. Other edits are diffed per word
+    or character, inline when small and on a worker thread once the texts are longer than
+    `offload_length`, so large edits never hold up the event loop. Edits longer than
+    `max_length` aren't diffed at all, `SequenceMatcher` is quadratic in the worst case.
+
+    ```python
+    fields.append(("Diff", await diffs.render(before, after), False))
+    ```
+    """
+
+    __slots__ = (
+        "granularity",
+        "max_length",
+        "offload_length",
+        "fast",
+        "inline",
+        "offloaded",
+        "skipped",
+        "timings",
+        "_executor",
+    )
+
+    def __init__(
+        self,
+        *,
+        granularity: GranularityT = "word",
+        max_length: int = 8000,
+        offload_length: int = 1000,
+        executor: concurrent.futures.Executor | None = None,
+    ) -> None:
+        """Create a new diff engine, a single worker thread is used if no `executor` is given."""
+        self.granularity: GranularityT = granularity
+        self.max_length: int = max_length
+        self.offload_length: int = offload_length
+        self.fast: int = 0
+        self.inline: int = 0
+        self.offloaded: int = 0
+        self.skipped: int = 0
+        self.timings: LatencyHistogram = LatencyHistogram()
+        self._executor: concurrent.futures.Executor = executor or concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="diff"
+        )
+
+    async def changes(self, old: str, new: str, *, granularity: GranularityT | None = None) -> list[str] | None:
+        """Get the removed and added chunks of an edit, or None if the texts are too long to diff."""
+        granularity = granularity or self.granularity
+        start = time.perf_counter()
+        try:
+            if old == new:
+                return []
+            if (changes := _fast_path(old, new)) is not None:
+                self.fast += 1
+                return changes
+            if len(old) + len(new) > self.max_length:
+                self.skipped += 1
+                return None
+            if len(old) + len(new) <= self.offload_length:
+                self.inline += 1
+                return _compare(old, new, granularity)
+
+            self.offloaded += 1
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, _compare, old, new, granularity
+            )
+        finally:
+            self.timings.record(time.perf_counter() - start)
+
+    async def render(
+        self, old: str, new: str, *, granularity: GranularityT | None = None, limit: int = MAX_FIELD_LENGTH
+    ) -> str:
+        """Get an edit as a diff code block of at most `limit` characters."""
+        changes = await self.changes(old, new, granularity=granularity)
+        if changes is None:
+            return f"Too long to diff ({len(old):,} → {len(new):,} characters)"
+        if not changes:
+            return "No changes"
+
+        budget = limit - len(_FENCE.format(""))
+        body = ""
+        for index, change in enumerate(changes):
+            change = _escape(change) + "\n"
+            if len(body) + len(change) > budget:
+                more = f"… {len(changes) - index:,} more changes\n"
+                body = truncate(body + change, budget - len(more), suffix="…\n") + more
+                break
+            body += change
+        return _FENCE.format(body)
+
+    def close(self) -> None:
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict[str, t.Any]:
+        """How edits were diffed and how long it took."""
+        return {
+            "fast": self.fast,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "skipped": self.skipped,
+            "timings": self.timings.summary(),
+        }
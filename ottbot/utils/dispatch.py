@@ -0,0 +1,191 @@
+# -*- coding=utf-8 -*-
+"""Ordered, fair scheduling of event listeners."""
+import asyncio
+import collections
+import functools
+import inspect
+import logging
+import time
+import typing as t
+
+import hikari
+import tanjun
+
+from ottbot.utils.metrics import LatencyHistogram
+
+__all__ = ("EventDispatcher", "by_guild", "by_message", "ordered")
+
+logger = logging.getLogger(__name__)
+
+_ListenerT = t.TypeVar("_ListenerT", bound=t.Callable[..., t.Coroutine[t.Any, t.Any, None]])
+_KeyT = t.Hashable
+_DISPATCHER_PARAMETER: t.Final[str] = "_event_dispatcher"
+
+
+def by_guild(event: hikari.Event) -> _KeyT | None:
+    """Queue events per guild, events outside guilds aren't ordered."""
+    return getattr(event, "guild_id", None)
+
+
+def by_message(event: hikari.Event) -> _KeyT | None:
+    """Queue events per message, for listeners that race themselves on the same message."""
+    return getattr(event, "message_id", None)
+
+
+class _Job:
+    __slots__ = ("callback", "queued_at")
+
+    def __init__(self, callback: t.Callable[[], t.Awaitable[None]]) -> None:
+        self.callback: t.Callable[[], t.Awaitable[None]] = callback
+        self.queued_at: float = time.perf_counter()
+
+
+class EventDispatcher:
+    """Runs listeners from per-key queues, in order within each queue and round robin across them.
+
+    At most one event of each queue runs at a time and at most `max_concurrency` run overall,
+    so a guild being raided gets one slot like every other guild instead of the whole loop.
+    Queues hold up to `max_depth` events, anything beyond that is dropped.
+
+    Listeners opt in with `ordered`.
+    """
+
+    __slots__ = (
+        "max_concurrency",
+        "max_depth",
+        "dispatched",
+        "dropped",
+        "failed",
+        "wait_latency",
+        "run_latency",
+        "_queues",
+        "_ready",
+        "_tasks",
+        "_idle",
+    )
+
+    def __init__(self, *, max_concurrency: int = 32, max_depth: int = 1000) -> None:
+        """Create a new event dispatcher."""
+        self.max_concurrency: int = max_concurrency
+        self.max_depth: int = max_depth
+        self.dispatched: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.wait_latency: LatencyHistogram = LatencyHistogram()
+        self.run_latency: LatencyHistogram = LatencyHistogram()
+        self._queues: dict[_KeyT, collections.deque[_Job]] = {}
+        self._ready: collections.deque[_KeyT] = collections.deque()
+        """Keys with queued events and nothing running, in the order they get their next turn."""
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._idle: asyncio.Event = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def running(self) -> int:
+        """Number of listeners running right now."""
+        return len(self._tasks)
+
+    def submit(self, key: _KeyT | None, callback: t.Callable[[], t.Awaitable[None]]) -> bool:
+        """Queue a listener call, returns False if its queue is full and the call was dropped."""
+        # Unkeyed events get a queue of their own, they're still counted towards the concurrency limit
+        key = object() if key is None else key
+        if (queue := self._queues.get(key)) is None:
+            queue = self._queues[key] = collections.deque()
+            self._ready.append(key)
+        elif len(queue) >= self.max_depth:
+            self.dropped += 1
+            return False
+
+        queue.append(_Job(callback))
+        self._idle.clear()
+        self._pump()
+        return True
+
+    def _pump(self) -> None:
+        while self._ready and len(self._tasks) < self.max_concurrency:
+            key = self._ready.popleft()
+            job = self._queues[key].popleft()
+            task = asyncio.create_task(self._run(key, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: _KeyT, job: _Job) -> None:
+        started = time.perf_counter()
+        self.wait_latency.record(started - job.queued_at)
+        try:
+            await job.callback()
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Listener for {key!r} failed")
+        finally:
+            self.dispatched += 1
+            self.run_latency.record(time.perf_counter() - started)
+            # Requeued at the back, so every other waiting queue runs once before this one runs again
+            if self._queues[key]:
+                self._ready.append(key)
+            else:
+                del self._queues[key]
+            # This task is only discarded from `_tasks` once it's done, make room for the next one now
+            self._tasks.discard(t.cast("asyncio.Task[None]", asyncio.current_task()))
+            self._pump()
+            if not self._tasks and not self._queues:
+                self._idle.set()
+
+    async def close(self) -> None:
+        """Wait until every queued event has been handled."""
+        await self._idle.wait()
+
+    def metrics(self) -> dict[str, t.Any]:
+        """Queue depths, counters and latencies."""
+        depths = sorted((len(queue) for queue in self._queues.values()), reverse=True)
+        return {
+            "queues": len(depths),
+            "queued": sum(depths),
+            "max_depth": depths[0] if depths else 0,
+            "running": self.running,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "wait": self.wait_latency.summary(),
+            "run": self.run_latency.summary(),
+        }
+
+
+def ordered(key: t.Callable[[t.Any], _KeyT | None] = by_guild) -> t.Callable[[_ListenerT], _ListenerT]:
+    """Run a listener through the `EventDispatcher`, in the queue `key` picks for each event.
+
+    ```python
+    @component.with_listener(hikari.GuildReactionAddEvent)
+    @ordered(by_message)
+    async def lsnr_reaction_add(event: hikari.GuildReactionAddEvent, db: AsyncPGDatabase = tanjun.inject(...)):
+        ...
+    ```
+
+    Dependencies are injected before the event is queued. The dispatcher itself is injected
+    through an extra keyword argument added to the listener's signature.
+    """
+
+    def decorator(listener: _ListenerT) -> _ListenerT:
+        signature = inspect.signature(listener)
+
+        @functools.wraps(listener)
+        async def wrapper(event: hikari.Event, *args: t.Any, **kwargs: t.Any) -> None:
+            dispatcher: EventDispatcher = kwargs.pop(_DISPATCHER_PARAMETER)
+            if not dispatcher.submit(key(event), functools.partial(listener, event, *args, **kwargs)):
+                logger.warning(f"Dropped {type(event).__name__}, the queue for {key(event)!r} is full")
+
+        # Tanjun reads the signature to find the listener's dependencies
+        wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter(
+                    _DISPATCHER_PARAMETER,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    default=tanjun.inject(type=EventDispatcher),
+                    annotation=EventDispatcher,
+                ),
+            ]
+        )
+        return t.cast(_ListenerT, wrapper)
+
+    return decorator
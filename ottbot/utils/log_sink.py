@@ -0,0 +1,121 @@
+# -*- coding=utf-8 -*-
+"""Batched delivery of log embeds."""
+import asyncio
+import collections
+import logging
+import typing as t
+
+import hikari
+
+__all__ = ("LogSink", "embed_length")
+
+logger = logging.getLogger(__name__)
+
+MAX_EMBEDS: t.Final[int] = 10
+"""Most embeds Discord allows in one message."""
+MAX_TOTAL_LENGTH: t.Final[int] = 6000
+"""Most characters Discord allows across every embed of one message."""
+
+
+def embed_length(embed: hikari.Embed) -> int:
+    """Number of characters of an embed that count towards `MAX_TOTAL_LENGTH`."""
+    length = len(embed.title or "") + len(embed.description or "")
+    if embed.footer is not None:
+        length += len(embed.footer.text or "")
+    if embed.author is not None:
+        length += len(embed.author.name or "")
+    return length + sum(len(field.name) + len(field.value) for field in embed.fields)
+
+
+class _Channel:
+    __slots__ = ("embeds", "wake", "task")
+
+    def __init__(self) -> None:
+        self.embeds: collections.deque[hikari.Embed] = collections.deque()
+        self.wake: asyncio.Event = asyncio.Event()
+        self.task: asyncio.Task[None] | None = None
+
+
+class LogSink:
+    """Buffers log embeds per channel and sends them in as few messages as possible.
+
+    Embeds are held for up to `delay` seconds, then sent in order, packing up to 10
+    embeds into each message while staying within Discord's total embed length.
+
+    ```python
+    log_sink.send(config.log_channel_id, embed)
+    ```
+    """
+
+    __slots__ = ("rest", "delay", "sent", "messages", "failed", "_channels", "_closing")
+
+    def __init__(self, rest: hikari.api.RESTClient, *, delay: float = 2.0) -> None:
+        """Create a new log sink."""
+        self.rest: hikari.api.RESTClient = rest
+        self.delay: float = delay
+        self.sent: int = 0
+        self.messages: int = 0
+        self.failed: int = 0
+        self._channels: dict[int, _Channel] = {}
+        self._closing: bool = False
+
+    def send(self, channel_id: hikari.SnowflakeishOr[hikari.TextableChannel], embed: hikari.Embed) -> None:
+        """Queue an embed to be sent to a channel."""
+        channel_id = int(channel_id)
+        if (channel := self._channels.get(channel_id)) is None:
+            channel = self._channels[channel_id] = _Channel()
+
+        channel.embeds.append(embed)
+        if len(channel.embeds) >= MAX_EMBEDS or self._closing:
+            channel.wake.set()
+        if channel.task is None:
+            channel.task = asyncio.create_task(self._drain(channel_id, channel))
+
+    def backlog(self) -> dict[int, int]:
+        """Number of embeds waiting to be sent, per channel."""
+        return {channel_id: len(channel.embeds) for channel_id, channel in self._channels.items() if channel.embeds}
+
+    async def close(self) -> None:
+        """Send every queued embed straight away and wait until they're delivered."""
+        self._closing = True
+        tasks = [channel.task for channel in self._channels.values() if channel.task is not None]
+        for channel in self._channels.values():
+            channel.wake.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _pack(embeds: collections.deque[hikari.Embed]) -> list[hikari.Embed]:
+        batch = [embeds.popleft()]
+        length = embed_length(batch[0])
+        while embeds and len(batch) < MAX_EMBEDS:
+            if (length := length + embed_length(embeds[0])) > MAX_TOTAL_LENGTH:
+                break
+            batch.append(embeds.popleft())
+        return batch
+
+    async def _drain(self, channel_id: int, channel: _Channel) -> None:
+        try:
+            try:
+                await asyncio.wait_for(channel.wake.wait(), timeout=self.delay)
+            except asyncio.TimeoutError:
+                pass
+
+            # Embeds queued while sending go out straight after, they already waited for the previous message
+            while channel.embeds:
+                batch = self._pack(channel.embeds)
+                try:
+                    await self.rest.create_message(channel_id, embeds=batch)
+                except hikari.HikariError as e:
+                    self.failed += len(batch)
+                    logger.warning(f"Failed to send {len(batch)} log embeds to {channel_id}: {e!r}")
+                else:
+                    self.sent += len(batch)
+                    self.messages += 1
+        finally:
+            channel.task = None
+            if not self._closing:
+                channel.wake.clear()
+
+    def metrics(self) -> dict[str, t.Any]:
+        """Totals and the per-channel backlog."""
+        return {"sent": self.sent, "messages": self.messages, "failed": self.failed, "backlog": self.backlog()}
@@ -0,0 +1,30 @@
+# -*- coding=utf-8 -*-
+"""Cheap comparisons of cached member states."""
+import typing as t
+
+import hikari
+
+__all__ = ("LOGGED_ATTRIBUTES", "has_logged_changes", "role_changes")
+
+LOGGED_ATTRIBUTES: t.Final[tuple[str, ...]] = (
+    "avatar_hash",
+    "guild_avatar_hash",
+    "nickname",
+    "username",
+    "discriminator",
+)
+"""Member attributes the member update log reports, compared as stored instead of through derived urls."""
+
+
+def has_logged_changes(old: hikari.Member, new: hikari.Member) -> bool:
+    """Whether anything the member update log reports changed, without building any urls or sets."""
+    # Most updates are presence or pending flag changes, which fail every comparison
+    return old.role_ids != new.role_ids or any(getattr(old, attr) != getattr(new, attr) for attr in LOGGED_ATTRIBUTES)
+
+
+def role_changes(
+    old: hikari.Member, new: hikari.Member
+) -> tuple[frozenset[hikari.Snowflake], frozenset[hikari.Snowflake]]:
+    """Get the ids of the roles that were added and removed, from the role ids both member states carry."""
+    old_ids, new_ids = frozenset(old.role_ids), frozenset(new.role_ids)
+    return new_ids - old_ids, old_ids - new_ids
@@ -0,0 +1,252 @@
+# -*- coding=utf-8 -*-
+"""On-disk store of recent messages, for logging edits and deletes of messages hikari's cache evicted."""
+import asyncio
+import concurrent.futures
+import dataclasses
+import datetime
+import logging
+import sqlite3
+import typing as t
+import zlib
+
+import hikari
+
+from ottbot.utils.funcs import full_name
+
+__all__ = ("MessageStore", "StoredMessage")
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_LENGTH: t.Final[int] = 128
+"""Content shorter than this many bytes is stored uncompressed, zlib would barely shrink it."""
+
+_SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    author_avatar_url TEXT NOT NULL,
+    content BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    attachments TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS messages_channel_id_idx ON messages (channel_id, id);
+"""
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class StoredMessage:
+    """A message read back from the `MessageStore`."""
+
+    id: hikari.Snowflake
+    guild_id: hikari.Snowflake
+    channel_id: hikari.Snowflake
+    author_id: hikari.Snowflake
+    author_name: str
+    author_avatar_url: str
+    content: str | None
+    attachments: tuple[str, ...] = ()
+
+    @property
+    def created_at(self) -> datetime.datetime:
+        return self.id.created_at
+
+    @property
+    def author_mention(self) -> str:
+        return f"<@{self.author_id}>"
+
+    @classmethod
+    def from_message(cls, message: hikari.Message, guild_id: hikari.Snowflake) -> "StoredMessage":
+        return cls(
+            id=message.id,
+            guild_id=guild_id,
+            channel_id=message.channel_id,
+            author_id=message.author.id,
+            author_name=full_name(message.author),
+            author_avatar_url=str(message.author.display_avatar_url),
+            content=message.content,
+            attachments=tuple(attachment.url for attachment in message.attachments),
+        )
+
+    def _to_row(self) -> tuple[t.Any, ...]:
+        content: bytes | None = None
+        compressed = False
+        if self.content is not None:
+            content = self.content.encode()
+            if compressed := len(content) >= COMPRESS_MIN_LENGTH:
+                content = zlib.compress(content)
+        return (
+            self.id,
+            self.guild_id,
+            self.channel_id,
+            self.author_id,
+            self.author_name,
+            self.author_avatar_url,
+            content,
+            compressed,
+            "\n".join(self.attachments),
+        )
+
+    @classmethod
+    def _from_row(cls, row: tuple[t.Any, ...]) -> "StoredMessage":
+        id_, guild_id, channel_id, author_id, author_name, avatar_url, content, compressed, attachments = row
+        if content is not None:
+            content = (zlib.decompress(content) if compressed else content).decode()
+        return cls(
+            id=hikari.Snowflake(id_),
+            guild_id=hikari.Snowflake(guild_id),
+            channel_id=hikari.Snowflake(channel_id),
+            author_id=hikari.Snowflake(author_id),
+            author_name=author_name,
+            author_avatar_url=avatar_url,
+            content=content,
+            attachments=tuple(attachments.split("\n")) if attachments else (),
+        )
+
+
+class MessageStore:
+    """Recent messages of every guild, kept in SQLite keyed by message id.
+
+    Only the newest `retention` messages of each channel are kept. New messages, edits and
+    deletes are buffered and written in one transaction every `flush_interval` seconds,
+    and all SQLite work runs on a single background thread, so the event loop never waits on disk.
+
+    ```python
+    message = event.old_message or await message_store.get(event.message_id)
+    ```
+    """
+
+    __slots__ = (
+        "path",
+        "retention",
+        "flush_interval",
+        "hits",
+        "misses",
+        "written",
+        "_conn",
+        "_executor",
+        "_pending",
+        "_deleted",
+        "_task",
+    )
+
+    def __init__(self, path: str, *, retention: int = 1000, flush_interval: float = 1.0) -> None:
+        """Create a new message store, `open` it before use."""
+        self.path: str = path
+        self.retention: int = retention
+        self.flush_interval: float = flush_interval
+        self.hits: int = 0
+        self.misses: int = 0
+        self.written: int = 0
+        self._conn: sqlite3.Connection | None = None
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._pending: dict[int, StoredMessage] = {}
+        self._deleted: set[int] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    def _run(self, func: t.Callable[..., t.Any], *args: t.Any) -> asyncio.Future[t.Any]:
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def open(self) -> None:
+        """Open the database and start writing in the background."""
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="message-store")
+        self._conn = await self._run(self._connect)
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    async def close(self) -> None:
+        """Write everything that is buffered and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._conn is not None:
+            await self.flush()
+            await self._run(self._conn.close)
+            self._conn = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def add(self, message: hikari.Message, guild_id: hikari.Snowflake) -> None:
+        """Store a message, or replace the stored copy after it was edited."""
+        self._pending[message.id] = StoredMessage.from_message(message, guild_id)
+        self._deleted.discard(message.id)
+
+    async def edit(self, message_id: hikari.Snowflakeish, content: str) -> StoredMessage | None:
+        """Replace the content of a stored message, returns the copy from before the edit."""
+        if (old := await self.get(message_id)) is not None:
+            self._pending[int(message_id)] = dataclasses.replace(old, content=content)
+        return old
+
+    def remove(self, message_id: hikari.Snowflakeish) -> None:
+        """Forget a deleted message."""
+        self._pending.pop(int(message_id), None)
+        self._deleted.add(int(message_id))
+
+    async def get(self, message_id: hikari.Snowflakeish) -> StoredMessage | None:
+        """Get a stored message, without making any requests to Discord."""
+        if (message := self._pending.get(int(message_id))) is None and self._conn is not None:
+            if int(message_id) not in self._deleted:
+                message = await self._run(self._select, int(message_id))
+
+        if message is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return message
+
+    def _select(self, message_id: int) -> StoredMessage | None:
+        assert self._conn is not None
+        row = self._conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return StoredMessage._from_row(row) if row is not None else None
+
+    async def flush(self) -> None:
+        """Write every buffered change to disk."""
+        if self._conn is None or not (self._pending or self._deleted):
+            return
+
+        pending, self._pending = self._pending, {}
+        deleted, self._deleted = self._deleted, set()
+        try:
+            await self._run(self._write, list(pending.values()), deleted)
+        except sqlite3.Error:
+            logger.exception(f"Failed to store {len(pending)} messages")
+        else:
+            self.written += len(pending)
+
+    def _write(self, messages: list[StoredMessage], deleted: set[int]) -> None:
+        assert self._conn is not None
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [message._to_row() for message in messages],
+            )
+            self._conn.executemany("DELETE FROM messages WHERE id = ?", [(id_,) for id_ in deleted])
+            # Ring buffer per channel: drop everything older than the newest `retention` messages
+            self._conn.executemany(
+                "DELETE FROM messages WHERE channel_id = ?1 AND id <= "
+                "(SELECT id FROM messages WHERE channel_id = ?1 ORDER BY id DESC LIMIT 1 OFFSET ?2)",
+                [(channel_id, self.retention) for channel_id in {message.channel_id for message in messages}],
+            )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def metrics(self) -> dict[str, int]:
+        """Hit and write counters for the stats command."""
+        return {"hits": self.hits, "misses": self.misses, "written": self.written, "pending": len(self._pending)}
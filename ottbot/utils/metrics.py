@@ -0,0 +1,67 @@
+# -*- coding=utf-8 -*-
+"""Lightweight in-process metrics."""
+import bisect
+import math
+import typing as t
+
+__all__ = ("LatencyHistogram",)
+
+_MIN_BOUND: t.Final[float] = 1e-5
+_GROWTH: t.Final[float] = 1.2
+_BOUNDS: t.Final[tuple[float, ...]] = tuple(
+    _MIN_BOUND * _GROWTH**i for i in range(int(math.log(1e7) / math.log(_GROWTH)) + 1)
+)
+"""Upper bounds of the histogram buckets, 10 microseconds to 100 seconds with 20% resolution."""
+
+
+class LatencyHistogram:
+    """A fixed size histogram of durations in seconds.
+
+    Memory use doesn't grow with the number of samples, percentiles are accurate to one bucket (~20%).
+    """
+
+    __slots__ = ("count", "total", "max", "_buckets")
+
+    def __init__(self) -> None:
+        """Create an empty histogram."""
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self._buckets: list[int] = [0] * (len(_BOUNDS) + 1)
+
+    def record(self, seconds: float) -> None:
+        """Add a single duration."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._buckets[bisect.bisect_left(_BOUNDS, seconds)] += 1
+
+    @property
+    def mean(self) -> float:
+        """Average duration in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Estimate the duration below which `q` percent of the samples fall."""
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+        for index, amount in enumerate(self._buckets):
+            seen += amount
+            if seen >= rank:
+                return min(_BOUNDS[index] if index < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        """Count, mean, max and p50/p95/p99 in a json serializable form."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
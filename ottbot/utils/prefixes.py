@@ -0,0 +1,128 @@
+# -*- coding=utf-8 -*-
+"""In-memory message command prefix lookup."""
+import typing as t
+
+__all__ = ("PrefixIndex",)
+
+
+class _Node:
+    __slots__ = ("children", "guilds", "is_global")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.guilds: set[int] = set()
+        self.is_global: bool = False
+
+
+class PrefixIndex:
+    """Global and per-guild message command prefixes stored in a single trie.
+
+    Resolving a message walks the trie over the first few characters of its content,
+    so plain chat that can't start with any known prefix is rejected after one dict lookup.
+
+    ```python
+    prefixes = PrefixIndex(["!"])
+    prefixes.set_guild(guild_id, ["?", "ott "])
+    prefixes.resolve(guild_id, "ott help")  # ("ott ",)
+    ```
+    """
+
+    __slots__ = ("_root", "_guilds", "_globals")
+
+    def __init__(self, global_prefixes: t.Iterable[str] = ()) -> None:
+        """Create a new prefix index."""
+        self._root: _Node = _Node()
+        self._guilds: dict[int, frozenset[str]] = {}
+        self._globals: frozenset[str] = frozenset()
+        self.set_global(global_prefixes)
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    def _walk(self, prefix: str, create: bool = False) -> _Node | None:
+        node = self._root
+        for char in prefix:
+            if (child := node.children.get(char)) is None:
+                if not create:
+                    return None
+                child = node.children[char] = _Node()
+            node = child
+        return node
+
+    def _prune(self, prefix: str) -> None:
+        """Remove the nodes of a prefix that no longer lead to anything."""
+        path = [self._root]
+        for char in prefix:
+            if (child := path[-1].children.get(char)) is None:
+                return
+            path.append(child)
+
+        for depth in range(len(prefix), 0, -1):
+            node = path[depth]
+            if node.children or node.guilds or node.is_global:
+                return
+            del path[depth - 1].children[prefix[depth - 1]]
+
+    def set_global(self, prefixes: t.Iterable[str]) -> None:
+        """Replace the prefixes every guild and DM can use."""
+        for prefix in self._globals:
+            if (node := self._walk(prefix)) is not None:
+                node.is_global = False
+                self._prune(prefix)
+
+        self._globals = frozenset(p for p in prefixes if p)
+        for prefix in self._globals:
+            t.cast(_Node, self._walk(prefix, create=True)).is_global = True
+
+    def set_guild(self, guild_id: int, prefixes: t.Iterable[str]) -> None:
+        """Replace the prefixes of a single guild."""
+        guild_id = int(guild_id)
+        new = frozenset(p for p in prefixes if p)
+        old = self._guilds.get(guild_id, frozenset())
+        if new == old:
+            return
+
+        for prefix in old - new:
+            if (node := self._walk(prefix)) is not None:
+                node.guilds.discard(guild_id)
+                self._prune(prefix)
+        for prefix in new - old:
+            t.cast(_Node, self._walk(prefix, create=True)).guilds.add(guild_id)
+
+        if new:
+            self._guilds[guild_id] = new
+        else:
+            self._guilds.pop(guild_id, None)
+
+    def remove_guild(self, guild_id: int) -> None:
+        """Forget every prefix of a guild."""
+        self.set_guild(guild_id, ())
+
+    def clear(self) -> None:
+        """Forget every guild prefix, global prefixes are kept."""
+        globals_ = self._globals
+        self._root = _Node()
+        self._guilds = {}
+        self._globals = frozenset()
+        self.set_global(globals_)
+
+    def get_guild(self, guild_id: int) -> frozenset[str]:
+        """Get the prefixes set for a guild, not including global prefixes."""
+        return self._guilds.get(int(guild_id), frozenset())
+
+    def resolve(self, guild_id: int | None, content: str | None) -> tuple[str, ...]:
+        """Get every prefix `content` starts with that is valid in a guild, longest first."""
+        if not content or (node := self._root.children.get(content[0])) is None:
+            return ()
+
+        matches: list[str] = []
+        depth = 1
+        while True:
+            if node.is_global or (guild_id is not None and guild_id in node.guilds):
+                matches.append(content[:depth])
+            if depth == len(content) or (node := node.children.get(content[depth])) is None:
+                break
+            depth += 1
+
+        matches.reverse()
+        return tuple(matches)
@@ -0,0 +1,419 @@
+# -*- coding=utf-8 -*-
+"""Star counting and debounced publishing of starboard posts."""
+import asyncio
+import collections
+import dataclasses
+import logging
+import time
+import typing as t
+
+import hikari
+
+from ottbot.constants import Colors
+from ottbot.db import (
+    AsyncPGDatabase,
+    GuildConfigService,
+    StarboardPost,
+    StarboardService,
+)
+from ottbot.utils.funcs import message_link
+
+__all__ = ("STAR_EMOJIS", "BackfillProgress", "StarboardBackfill", "StarboardTracker", "count_stars", "starboard_embed")
+
+logger = logging.getLogger(__name__)
+
+# https://apps.timwhitlock.info/unicode/inspect for unicode character names of '⭐🌟✨💫'
+STAR_EMOJIS = ("\N{WHITE MEDIUM STAR}", "\N{GLOWING STAR}", "\N{SPARKLES}", "\N{DIZZY SYMBOL}")  # noqa: FS003
+
+
+def count_stars(reactions: t.Sequence[hikari.Reaction]) -> int:
+    """Count the number of star emojis in a sequence of reactions."""
+    return sum([r.count for r in reactions if r.emoji.name in STAR_EMOJIS])
+
+
+def starboard_embed(
+    guild_id: hikari.Snowflakeish, message: hikari.Message, author: hikari.User | hikari.Member, count: int
+) -> hikari.Embed:
+    """Build the embed of a starboard post."""
+    link = message_link(guild_id, message.channel_id, message.id)
+    embed = hikari.Embed(title="Jump to message", description=message.content, url=link, color=Colors.YELLOW)
+    # TODO: fix when url can be a hikari.URL
+    embed.set_author(
+        name=f"{getattr(author, 'display_name', author.username)} with {count}x \N{WHITE MEDIUM STAR}",
+        icon=author.display_avatar_url,
+    )
+    return embed
+
+
+class _Entry:
+    __slots__ = ("guild_id", "channel_id", "count", "message", "version", "dirty_since", "timer", "lock")
+
+    def __init__(self, guild_id: hikari.Snowflake, channel_id: hikari.Snowflake) -> None:
+        self.guild_id: hikari.Snowflake = guild_id
+        self.channel_id: hikari.Snowflake = channel_id
+        self.count: int | None = None
+        """Stars on the message, None until it's fetched or after changes that can't be counted incrementally."""
+        self.message: hikari.Message | None = None
+        self.version: int = 0
+        """Incremented by every event, tells a publish whether events arrived while it fetched the message."""
+        self.dirty_since: float | None = None
+        self.timer: asyncio.TimerHandle | None = None
+        self.lock: asyncio.Lock = asyncio.Lock()
+
+    @property
+    def idle(self) -> bool:
+        return self.timer is None and not self.lock.locked()
+
+
+class StarboardTracker:
+    """Counts stars per message from reaction events and publishes them to the starboard.
+
+    Each message's starboard post is only written once no star was added or removed for
+    `delay` seconds, or at the latest `max_delay` seconds after the first unpublished change,
+    so a burst of 50 stars costs one fetch and one edit. Publishing a message holds its lock,
+    reactions racing each other can't create duplicate posts.
+
+    ```python
+    starboard.star_added(event.guild_id, event.channel_id, event.message_id)
+    ```
+    """
+
+    __slots__ = (
+        "bot",
+        "posts",
+        "configs",
+        "delay",
+        "max_delay",
+        "max_entries",
+        "events",
+        "publishes",
+        "fetches",
+        "_entries",
+        "_tasks",
+    )
+
+    def __init__(
+        self,
+        bot: hikari.GatewayBot,
+        posts: StarboardService,
+        configs: GuildConfigService,
+        *,
+        delay: float = 5.0,
+        max_delay: float = 30.0,
+        max_entries: int = 10_000,
+    ) -> None:
+        """Create a new starboard tracker."""
+        self.bot: hikari.GatewayBot = bot
+        self.posts: StarboardService = posts
+        self.configs: GuildConfigService = configs
+        self.delay: float = delay
+        self.max_delay: float = max_delay
+        self.max_entries: int = max_entries
+        self.events: int = 0
+        self.publishes: int = 0
+        self.fetches: int = 0
+        self._entries: collections.OrderedDict[int, _Entry] = collections.OrderedDict()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def _entry(
+        self, guild_id: hikari.Snowflake, channel_id: hikari.Snowflake, message_id: hikari.Snowflake
+    ) -> _Entry:
+        if (entry := self._entries.get(message_id)) is None:
+            entry = self._entries[message_id] = _Entry(guild_id, channel_id)
+            self._evict()
+        else:
+            self._entries.move_to_end(message_id)
+        return entry
+
+    def _evict(self) -> None:
+        # Least recently changed first, entries with a pending publish are skipped
+        if (excess := len(self._entries) - self.max_entries) <= 0:
+            return
+        evicted: list[int] = []
+        for message_id, entry in self._entries.items():
+            if entry.idle:
+                evicted.append(message_id)
+                if len(evicted) == excess:
+                    break
+        for message_id in evicted:
+            del self._entries[message_id]
+
+    def _changed(self, message_id: hikari.Snowflake, entry: _Entry) -> None:
+        self.events += 1
+        entry.version += 1
+        now = time.monotonic()
+        if entry.dirty_since is None:
+            entry.dirty_since = now
+        if entry.timer is not None:
+            entry.timer.cancel()
+        delay = max(0.0, min(self.delay, entry.dirty_since + self.max_delay - now))
+        entry.timer = asyncio.get_running_loop().call_later(delay, self._publish_later, message_id)
+
+    def _publish_later(self, message_id: hikari.Snowflake) -> None:
+        task = asyncio.create_task(self.publish(message_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def star_added(
+        self, guild_id: hikari.Snowflake, channel_id: hikari.Snowflake, message_id: hikari.Snowflake
+    ) -> None:
+        """Count a star added to a message, which may create its starboard post."""
+        entry = self._entry(guild_id, channel_id, message_id)
+        if entry.count is not None:
+            entry.count += 1
+        self._changed(message_id, entry)
+
+    def star_removed(
+        self, guild_id: hikari.Snowflake, channel_id: hikari.Snowflake, message_id: hikari.Snowflake
+    ) -> None:
+        """Count a star removed from a message, which only matters if it has a starboard post."""
+        if message_id not in self._entries and not self.posts.might_be_starred(message_id):
+            return
+        entry = self._entry(guild_id, channel_id, message_id)
+        if entry.count is not None:
+            entry.count = max(0, entry.count - 1)
+        self._changed(message_id, entry)
+
+    def recount(
+        self, guild_id: hikari.Snowflake, channel_id: hikari.Snowflake, message_id: hikari.Snowflake
+    ) -> None:
+        """Re-read the stars of a message before publishing, after every reaction of an emoji was removed."""
+        if message_id not in self._entries and not self.posts.might_be_starred(message_id):
+            return
+        entry = self._entry(guild_id, channel_id, message_id)
+        entry.count = None
+        self._changed(message_id, entry)
+
+    def cleared(
+        self, guild_id: hikari.Snowflake, channel_id: hikari.Snowflake, message_id: hikari.Snowflake
+    ) -> None:
+        """Every reaction of a message was removed."""
+        if message_id not in self._entries and not self.posts.might_be_starred(message_id):
+            return
+        entry = self._entry(guild_id, channel_id, message_id)
+        entry.count = 0
+        self._changed(message_id, entry)
+
+    async def publish(self, message_id: hikari.Snowflake) -> None:
+        """Create, edit or delete the starboard post of a message with its current star count."""
+        if (entry := self._entries.get(message_id)) is None:
+            return
+
+        async with entry.lock:
+            if entry.timer is not None:
+                entry.timer.cancel()
+                entry.timer = None
+            entry.dirty_since = None
+            try:
+                await self._publish(message_id, entry)
+            except hikari.HikariError as e:
+                # Forget the count, the next change re-reads the message
+                entry.count = None
+                logger.warning(f"Failed to publish stars of {message_id}: {e!r}")
+            except Exception:
+                # Runs in a task nobody awaits, so this is the only place the error can be reported
+                entry.count = None
+                logger.exception(f"Failed to publish stars of {message_id}")
+
+    async def _publish(self, message_id: hikari.Snowflake, entry: _Entry) -> None:
+        config = await self.configs.get(entry.guild_id)
+        if config.starboard_channel_id is None:
+            return
+
+        version = entry.version
+        if entry.count is None or (entry.message is None and entry.count > 0):
+            self.fetches += 1
+            entry.message = await self.bot.rest.fetch_message(entry.channel_id, message_id)
+            entry.count = count_stars(entry.message.reactions)
+        count = entry.count
+        if entry.version != version:
+            # Reactions that arrived during the fetch may or may not be included, recount on the next publish
+            entry.count = None
+
+        self.publishes += 1
+        starboard = await self.posts.get(message_id)
+        if starboard is not None and count == 0:
+            await self.bot.rest.delete_message(starboard.sent_channel_id, starboard.sent_message_id)
+            await self.posts.remove(message_id)
+            return
+        if count == 0 or entry.message is None:
+            return
+
+        message = entry.message
+        author = self.bot.cache.get_member(entry.guild_id, message.author.id) or message.author
+        embed = starboard_embed(entry.guild_id, message, author, count)
+        if starboard is not None:
+            await self.bot.rest.edit_message(starboard.sent_channel_id, starboard.sent_message_id, embed=embed)
+        else:
+            sent_msg = await self.bot.rest.create_message(config.starboard_channel_id, embed=embed)
+            starboard = StarboardPost(entry.channel_id, message_id, config.starboard_channel_id, sent_msg.id)
+        await self.posts.save(
+            starboard, guild_id=entry.guild_id, author_id=message.author.id, created_at=message.created_at, stars=count
+        )
+
+    async def post(self, guild_id: hikari.Snowflake, message: hikari.Message) -> bool:
+        """Create the starboard post of an already fetched message, False if it already has one."""
+        if await self.posts.get(message.id) is not None:
+            return False
+
+        entry = self._entry(guild_id, message.channel_id, message.id)
+        async with entry.lock:
+            # A star added while the lock was taken may have posted it already
+            if await self.posts.get(message.id) is not None:
+                return False
+            entry.message = message
+            entry.count = count_stars(message.reactions)
+        await self.publish(message.id)
+        return await self.posts.get(message.id) is not None
+
+    async def close(self) -> None:
+        """Publish every pending change straight away."""
+        pending = [message_id for message_id, entry in self._entries.items() if entry.timer is not None]
+        await asyncio.gather(*self._tasks, *map(self.publish, pending), return_exceptions=True)
+
+    def metrics(self) -> dict[str, int]:
+        """Counters for the stats command."""
+        return {
+            "tracked": len(self._entries),
+            "pending": sum(entry.timer is not None for entry in self._entries.values()),
+            "events": self.events,
+            "publishes": self.publishes,
+            "fetches": self.fetches,
+        }
+
+
+@dataclasses.dataclass(slots=True)
+class BackfillProgress:
+    """Progress of a single `StarboardBackfill` scan."""
+
+    guild_id: hikari.Snowflake
+    channel_id: hikari.Snowflake
+    threshold: int
+    resumed_from: hikari.Snowflake | None = None
+    scanned: int = 0
+    posted: int = 0
+    error: str | None = None
+
+
+class StarboardBackfill:
+    """Posts the already starred messages of a channel to the starboard.
+
+    The channel's history is read oldest first, one page of 100 messages at a time and at
+    most one page every `page_interval` seconds, leaving room in the rate limits for
+    everything else the bot does. Only the current page is held in memory. The newest
+    scanned message is saved after every page, so a scan that was stopped resumes there.
+
+    ```python
+    await backfill.start(guild_id, channel_id, threshold=3, on_done=report)
+    ```
+    """
+
+    __slots__ = ("bot", "db", "tracker", "page_interval", "_running")
+
+    PAGE_SIZE: t.Final[int] = 100
+    """Most messages Discord returns per request."""
+
+    def __init__(
+        self, bot: hikari.GatewayBot, db: AsyncPGDatabase, tracker: StarboardTracker, *, page_interval: float = 1.0
+    ) -> None:
+        """Create a new starboard backfill."""
+        self.bot: hikari.GatewayBot = bot
+        self.db: AsyncPGDatabase = db
+        self.tracker: StarboardTracker = tracker
+        self.page_interval: float = page_interval
+        self._running: dict[int, tuple[BackfillProgress, asyncio.Task[None]]] = {}
+
+    def progress(self, channel_id: hikari.Snowflakeish) -> BackfillProgress | None:
+        """Get the progress of the scan running in a channel."""
+        return running[0] if (running := self._running.get(int(channel_id))) is not None else None
+
+    async def start(
+        self,
+        guild_id: hikari.Snowflake,
+        channel_id: hikari.Snowflake,
+        *,
+        threshold: int,
+        restart: bool = False,
+        on_done: t.Callable[[BackfillProgress], t.Awaitable[None]] | None = None,
+    ) -> BackfillProgress:
+        """Start scanning a channel in the background, or get the progress of the scan already running there."""
+        if (running := self.progress(channel_id)) is not None:
+            return running
+
+        progress = BackfillProgress(guild_id, channel_id, threshold)
+        if not restart:
+            checkpoint = await self.db.fetch(
+                "SELECT last_message_id FROM starboard_backfill WHERE channel_id = $1", channel_id
+            )
+            progress.resumed_from = hikari.Snowflake(checkpoint) if checkpoint is not None else None
+            # Started by someone else while the checkpoint was read
+            if (running := self.progress(channel_id)) is not None:
+                return running
+
+        task = asyncio.create_task(self._run(progress, on_done))
+        self._running[int(channel_id)] = (progress, task)
+        return progress
+
+    async def _run(
+        self,
+        progress: BackfillProgress,
+        on_done: t.Callable[[BackfillProgress], t.Awaitable[None]] | None,
+    ) -> None:
+        # Everything up to the last saved page is kept, running the scan again resumes there
+        try:
+            await self._scan(progress)
+        except asyncio.CancelledError:
+            progress.error = "the bot shut down"
+            raise
+        except hikari.HikariError as e:
+            progress.error = repr(e)
+            logger.warning(f"Starboard backfill of {progress.channel_id} stopped: {e!r}")
+        except Exception as e:
+            progress.error = repr(e)
+            logger.exception(f"Starboard backfill of {progress.channel_id} failed")
+        finally:
+            # Finished as far as `start` is concerned, the channel can be scanned again while the result is reported
+            self._running.pop(int(progress.channel_id), None)
+            if on_done is not None:
+                try:
+                    await on_done(progress)
+                except Exception:
+                    logger.exception(f"Failed to report the starboard backfill of {progress.channel_id}")
+
+    async def _scan(self, progress: BackfillProgress) -> None:
+        # No message is older than its channel
+        after = progress.resumed_from or progress.channel_id
+        messages = self.bot.rest.fetch_messages(progress.channel_id, after=after)
+        async for page in messages.chunk(self.PAGE_SIZE):
+            started = time.monotonic()
+            posted = 0
+            for message in page:
+                if count_stars(message.reactions) >= progress.threshold:
+                    posted += await self.tracker.post(progress.guild_id, message)
+
+            progress.scanned += len(page)
+            progress.posted += posted
+            await self.db.execute(
+                "INSERT INTO starboard_backfill (channel_id, guild_id, last_message_id, scanned, posted) "
+                "VALUES ($1, $2, $3, $4, $5) ON CONFLICT (channel_id) DO UPDATE SET "
+                "last_message_id = excluded.last_message_id, "
+                "scanned = starboard_backfill.scanned + excluded.scanned, "
+                "posted = starboard_backfill.posted + excluded.posted, completed_at = NULL",
+                progress.channel_id,
+                progress.guild_id,
+                max(message.id for message in page),
+                len(page),
+                posted,
+            )
+            await asyncio.sleep(max(0.0, self.page_interval - (time.monotonic() - started)))
+
+        await self.db.execute(
+            "UPDATE starboard_backfill SET completed_at = now() WHERE channel_id = $1", progress.channel_id
+        )
+
+    async def close(self) -> None:
+        """Stop every running scan, they resume from their last saved page when started again."""
+        tasks = [task for _, task in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)